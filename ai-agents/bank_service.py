@@ -1,8 +1,31 @@
 import requests
+import hashlib
 import logging
+import os
+import uuid
+import orjson
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
+from deadline import timeout_for
+
+# Longest a bank API call may take, shortened to the time left in the chat turn
+API_TIMEOUT = float(os.getenv("BANK_API_TIMEOUT", "10"))
+# Writes carry an Idempotency-Key, so a slow attempt is cut short and retried instead of waited for
+WRITE_ATTEMPT_TIMEOUT = float(os.getenv("BANK_API_WRITE_ATTEMPT_TIMEOUT", "4"))
+WRITE_RETRIES = int(os.getenv("BANK_API_WRITE_RETRIES", "2"))
+
+
+def idempotency_key(scope: Optional[str], *operation: Any) -> str:
+    """
+    Idempotency-Key of a write: the same for the same operation within `scope` (the agent run of a
+    chat turn, given by the tool), so a tool call the agent runs again is applied once. Random
+    without a scope.
+    """
+    if scope is None:
+        return uuid.uuid4().hex
+    return hashlib.sha256(orjson.dumps([scope, *operation])).hexdigest()
+
 
 class BankAPIClient:
     """A client service for interacting with the Bank API with comprehensive logging."""
@@ -35,7 +58,18 @@ class BankAPIClient:
         
         self.logger.info(f"Bank API Client initialized with base URL: http://host.docker.internal:8000")
     
-    def request_loan(self, user: str, amount: float, date: Optional[datetime] = None) -> Dict[str, Any]:
+    def _post_write(self, path: str, payload: Dict[str, Any], idempotency_key: str) -> requests.Response:
+        """POST a write, retried with the same Idempotency-Key after a timeout or a connection error."""
+        headers = {"Idempotency-Key": idempotency_key}
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return requests.post(f"http://host.docker.internal:8000{path}", json=payload, headers=headers, timeout=timeout_for(WRITE_ATTEMPT_TIMEOUT))
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if attempt == WRITE_RETRIES:
+                    raise
+                self.logger.warning(f"Attempt {attempt + 1} of {path} failed ({e}), retrying with the same idempotency key")
+
+    def request_loan(self, user: str, amount: float, date: Optional[datetime] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Request a loan through the API.
         
@@ -43,6 +77,7 @@ class BankAPIClient:
             user: Username of the loan requester
             amount: Amount of money to borrow
             date: Date of the loan request (defaults to current time)
+            idempotency_key: Key the API recognizes repeats of this request by (defaults to a random one)
             
         Returns:
             Dictionary containing the response data
@@ -60,7 +95,7 @@ class BankAPIClient:
         self.logger.debug(f"Request payload: {payload}")
         
         try:
-            response = requests.post(f"http://host.docker.internal:8000/request-loan", json=payload)
+            response = self._post_write("/request-loan", payload, idempotency_key or uuid.uuid4().hex)
             
             response_data = response.json()
             response.raise_for_status()
@@ -75,12 +110,12 @@ class BankAPIClient:
             return response_data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error in loan request: {e}")
-            return response_data
+            return {"error": str(e)}
         except Exception as e:
             self.logger.error(f"Unexpected error in loan request: {e}")
-            return response_data
+            return {"error": str(e)}
     
-    def send_money(self, emitter: str, receiver: str, amount: float, date: Optional[datetime] = None) -> Dict[str, Any]:
+    def send_money(self, emitter: str, receiver: str, amount: float, date: Optional[datetime] = None, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Send money from one account to another.
         
@@ -89,6 +124,7 @@ class BankAPIClient:
             receiver: Receiver's username
             amount: Amount of money to send
             date: Date of the transaction (defaults to current time)
+            idempotency_key: Key the API recognizes repeats of this request by (defaults to a random one)
             
         Returns:
             Dictionary containing the response data
@@ -107,7 +143,7 @@ class BankAPIClient:
         self.logger.debug(f"Request payload: {payload}")
         
         try:
-            response = requests.post(f"http://host.docker.internal:8000/send-money", json=payload)
+            response = self._post_write("/send-money", payload, idempotency_key or uuid.uuid4().hex)
             response_data = response.json()
             response.raise_for_status()
             
@@ -122,10 +158,10 @@ class BankAPIClient:
             return response_data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error in money transfer: {e}")
-            return response_data
+            return {"error": str(e)}
         except Exception as e:
             self.logger.error(f"Unexpected error in money transfer: {e}")
-            return response_data
+            return {"error": str(e)}
     
     def get_balance(self, account: str) -> Dict[str, float]:
         """
@@ -143,7 +179,7 @@ class BankAPIClient:
         self.logger.debug(f"Request headers: {headers}")
         
         try:
-            response = requests.get(f"http://host.docker.internal:8000/balance", headers=headers)
+            response = requests.get(f"http://host.docker.internal:8000/balance", headers=headers, timeout=timeout_for(API_TIMEOUT))
             response_data = response.json()
             response.raise_for_status()
             
@@ -158,36 +194,94 @@ class BankAPIClient:
             return response_data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error in balance check: {e}")
-            return response_data
+            return {"error": str(e)}
         except Exception as e:
             self.logger.error(f"Unexpected error in balance check: {e}")
+            return {"error": str(e)}
+    
+    def get_loans(self, user: str) -> Dict[str, Any]:
+        """
+        Get the loans of a user with their decision status.
+        
+        Args:
+            user: Username of the borrower
+            
+        Returns:
+            Dictionary containing the list of loans, newest first
+        """
+        headers = {"user": user}
+        
+        self.logger.info(f"Getting loans for user '{user}'")
+        
+        try:
+            response = requests.get(f"http://host.docker.internal:8000/loans", headers=headers, timeout=timeout_for(API_TIMEOUT))
+            response_data = response.json()
+            response.raise_for_status()
+            
+            self.logger.info(f"Retrieved {len(response_data.get('loans', []))} loans")
+            self.logger.debug(f"Response data: {response_data}")
+            
+            return response_data
+        except requests.exceptions.HTTPError as e:
+            self.logger.error(f"HTTP error in loans retrieval: {e}")
             return response_data
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Network error in loans retrieval: {e}")
+            return {"error": str(e)}
+        except Exception as e:
+            self.logger.error(f"Unexpected error in loans retrieval: {e}")
+            return {"error": str(e)}
     
-    def get_transactions_history(self, emitter: str) -> Dict[str, List[Dict[str, Any]]]:
+    def get_transactions_history(
+        self,
+        emitter: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        fields: Optional[List[str]] = None,
+        columnar: bool = False,
+        since: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
         """
-        Get transaction history of a specific user.
+        Get transaction history of a specific user, newest first.
         
         Args:
             emitter: connected user's username
+            limit: Maximum number of transactions to return (defaults to all)
+            offset: Number of newest transactions to skip, for pagination
+            fields: Transaction columns to return (defaults to all)
+            columnar: Return the transactions as one list per column instead of one dict per transaction
+            since: Only transactions at or after this date, the API then only reads the recent partitions
 
             
         Returns:
-            Dictionary containing the list of transactions
+            Dictionary containing the transactions, the total count and the sent/received totals
         """
         headers = {
             "emitter": emitter,
         }
+        params = {"offset": offset}
+        if limit is not None:
+            params["limit"] = limit
+        if fields:
+            params["fields"] = ",".join(fields)
+        if columnar:
+            params["format"] = "columnar"
+        if since is not None:
+            params["since"] = since.isoformat()
         
         self.logger.info(f"Getting transaction history for '{emitter}'")
         self.logger.debug(f"Request headers: {headers}")
         
         try:
-            response = requests.get(f"http://host.docker.internal:8000/transactions-history", headers=headers)
-            response_data = response.json()
+            response = requests.get(f"http://host.docker.internal:8000/transactions-history", headers=headers, params=params, timeout=timeout_for(API_TIMEOUT))
+            # orjson parses large histories several times faster than the json module
+            response_data = orjson.loads(response.content)
             response.raise_for_status()
             
-            num_transactions = len(response_data.get("transactions", []))
-            self.logger.info(f"Retrieved {num_transactions} transactions")
+            transactions = response_data.get("transactions", [])
+            if isinstance(transactions, dict):  # columnar, count the values of any column
+                transactions = next(iter(transactions.values()), [])
+            self.logger.info(f"Retrieved {len(transactions)} transactions")
             self.logger.debug(f"Response data: {response_data}")
             
             return response_data
@@ -197,10 +291,10 @@ class BankAPIClient:
             return response_data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Network error in transaction history retrieval: {e}")
-            return response_data
+            return {"error": str(e)}
         except Exception as e:
             self.logger.error(f"Unexpected error in transaction history retrieval: {e}")
-            return response_data
+            return {"error": str(e)}
 
 
 
@@ -0,0 +1,424 @@
+"""
+Banking and FAQ tools shared by every agent (multi_test.py, structured_agent.py, speculative.py
+and the bank_agent.py / multi_bank_agent.py scripts).
+
+The scraping stack (newspaper, lxml) and the FAQ index (numpy) are only imported the first time a
+tool needs them, so a worker that never gets an FAQ question never loads them. Agents get fresh
+tool instances by name through `create_tools`.
+
+The ToolCallingAgent runs the tool calls of one LLM response one after the other, even the reads.
+Reads only run concurrently through `BankOperationsTool`, which takes several operations in one
+call: the agent is pointed to it whenever a message asks for more than one.
+"""
+import asyncio
+import json
+import logging
+import traceback
+from typing import Any, Literal, Optional
+
+from beeai_framework.context import RunContext
+from beeai_framework.emitter.emitter import Emitter
+from beeai_framework.logger import Logger
+from beeai_framework.tools.errors import ToolInputValidationError
+from beeai_framework.tools.tool import Tool
+from beeai_framework.tools.types import StringToolOutput, ToolRunOptions
+from pydantic import BaseModel, Field
+
+from bank_service import BankAPIClient, idempotency_key
+from deadline import timeout_for
+from faq_store import FAQStore
+from instrumentation import record_tool_call
+from tool_output import HISTORY_FIELDS, HISTORY_PAGE_SIZE, render_balance, render_history, render_loan, render_loans, render_transfer
+import session_context
+
+logger = Logger(__name__)
+ 
+# ---- INPUT SCHEMAS ----
+class BankToolInput(BaseModel):
+    action: Literal["request-loan", "make-transfer", "get-balance", "get-transaction-history", "get-loan-status"]
+    user: str
+    amount: Optional[float] = None
+    receiver: Optional[str] = None
+ 
+class ScraperToolInput(BaseModel):
+    url: str
+
+class FAQSearchToolInput(BaseModel):
+    query: str = Field(description="The user's question, or its key words")
+    bank: Optional[str] = Field(default=None, description="Bank name to restrict the search to, e.g. biat, zitouna, wifakbank")
+ 
+# ---- TOOLS ----
+SCRAPE_TIMEOUT = 10
+
+
+class ScraperTool(Tool[ScraperToolInput, ToolRunOptions, StringToolOutput]):
+    name = "ScraperTool"
+    description = "Extracts and returns main informational content from a banking FAQ or information page."
+    input_schema = ScraperToolInput
+ 
+    def __init__(self, options: dict[str, any] | None = None):
+        super().__init__(options)
+        self.logger = logging.getLogger("ScraperTool")
+        self._store: Optional[FAQStore] = None
+
+    @property
+    def store(self) -> FAQStore:
+        if self._store is None:
+            self._store = FAQStore()
+        return self._store
+ 
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "scraper"], creator=self)
+ 
+    @staticmethod
+    def _scrape(url: str) -> dict[str, str]:
+        # newspaper pulls in lxml, nltk and PIL: only loaded once a page is scraped live
+        from newspaper import Article
+
+        # A slow bank site must not hold the turn past its deadline
+        article = Article(url, request_timeout=timeout_for(SCRAPE_TIMEOUT))
+        article.download()
+        article.parse()
+        return {"title": article.title, "text": article.text}
+ 
+    async def _run(self, input: ScraperToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        # Ingested pages are served from the local FAQ store, only unknown URLs are fetched live.
+        # Opening the store on the first call and the query run in the worker thread, off the loop
+        chunks = await asyncio.to_thread(lambda: self.store.chunks_for_url(input.url))
+        if chunks:
+            return StringToolOutput("\n\n".join(chunk.render() for chunk in chunks))
+        try:
+            result = await asyncio.to_thread(self._scrape, input.url)
+            return StringToolOutput(json.dumps(result))
+        except Exception as e:
+            traceback.print_exc()
+            return StringToolOutput(json.dumps({"error": f"Failed to scrape {input.url}: {str(e)}"}))
+
+
+NO_FAQ_MATCH = "No matching FAQ entry found."
+
+
+class FAQSearchTool(Tool[FAQSearchToolInput, ToolRunOptions, StringToolOutput]):
+    name = "FAQSearchTool"
+    description = "Searches the banks' FAQ pages (BIAT, Zitouna, ABC, Webank, Wifak, Al Baraka) and returns the most relevant questions and answers."
+    input_schema = FAQSearchToolInput
+    read_only = True
+
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self._retriever = None
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            # numpy and the memory-mapped index are loaded with the first FAQ question
+            from faq_index import FAQRetriever
+
+            self._retriever = FAQRetriever(FAQStore())
+        return self._retriever
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "faq"], creator=self)
+
+    async def _run(self, input: FAQSearchToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        # Loading the index on the first question happens in the worker thread too
+        chunks = await asyncio.to_thread(lambda: self.retriever.search(input.query, input.bank))
+        if not chunks:
+            return StringToolOutput(NO_FAQ_MATCH)
+        return StringToolOutput("\n\n".join(chunk.render() for chunk in chunks))
+ 
+       
+class GetBalanceToolInput(BaseModel):
+    user: str
+ 
+ 
+class GetBalanceTool(Tool[GetBalanceToolInput, ToolRunOptions, StringToolOutput]):
+    name = "GetBalanceTool"
+    description = (
+        "Get user's account balance"
+    )
+    input_schema = GetBalanceToolInput
+    read_only = True
+ 
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.bank_client = BankAPIClient()
+ 
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+ 
+    async def fetch(self, input: GetBalanceToolInput) -> dict[str, Any]:
+        cached = await session_context.prefetched("balance", input.user)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.bank_client.get_balance, input.user)
+ 
+    async def _run(self, input: GetBalanceToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        try:
+                result = await self.fetch(input)
+                return StringToolOutput(render_balance(result))
+        except Exception as e:
+            logger.error(f"Error in GetBalanceTool: {e}")
+            raise ToolInputValidationError(f"Banking operation failed GetBalanceTool: {e}")
+       
+ 
+ 
+class MakeTransferToolInput(BaseModel):
+    user: str
+    amount: Optional[float]
+    receiver: Optional[str]
+ 
+class MakeTransferTool(Tool[MakeTransferToolInput, ToolRunOptions, StringToolOutput]):
+    name = "MakeTransferTool"
+    description = (
+        "Make money transfer from user account to another"
+    )
+    input_schema = MakeTransferToolInput
+    read_only = False
+ 
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.bank_client = BankAPIClient()
+ 
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+ 
+    async def fetch(self, input: MakeTransferToolInput, occurrence: int = 0, scope: Optional[str] = None) -> dict[str, Any]:
+        if input.amount is None or input.receiver is None:
+            raise ToolInputValidationError("Amount and receiver are required for transfer.")
+        key = idempotency_key(scope, "make-transfer", input.user, input.receiver, input.amount, occurrence)
+        result = await asyncio.to_thread(self.bank_client.send_money, input.user, input.receiver, input.amount, idempotency_key=key)
+        # Even a failed call may have gone through, the prefetched balances and histories are dropped either way
+        session_context.invalidate(input.user, ("balance", "history"))
+        session_context.invalidate(input.receiver, ("balance", "history"))
+        return result
+ 
+    async def _run(self, input: MakeTransferToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        try:
+            result = await self.fetch(input, scope=run_scope(context))
+            return StringToolOutput(render_transfer(result))
+        except Exception as e:
+            logger.error(f"Error in MakeTransferTool: {e}")
+            raise ToolInputValidationError(f"Banking operation failed MakeTransferTool: {e}")
+       
+ 
+       
+class GetTransactionHistoryToolInput(BaseModel):
+    user: str
+    page: int = Field(default=1, ge=1, description="Page of older transactions, only when the user asks for more")
+ 
+ 
+class GetTransactionHistoryTool(Tool[GetTransactionHistoryToolInput, ToolRunOptions, StringToolOutput]):
+    name = "GetTransactionHistoryTool"
+    description = (
+        "Get Transactions History of a user account: totals and the latest transactions, newest first"
+    )
+    input_schema = GetTransactionHistoryToolInput
+    read_only = True
+ 
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.bank_client = BankAPIClient()
+ 
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+ 
+    async def fetch(self, input: GetTransactionHistoryToolInput) -> dict[str, Any]:
+        if input.page == 1:
+            cached = await session_context.prefetched("history", input.user)
+            if cached is not None:
+                return cached
+        return await asyncio.to_thread(
+            self.bank_client.get_transactions_history,
+            input.user,
+            limit=HISTORY_PAGE_SIZE,
+            offset=(input.page - 1) * HISTORY_PAGE_SIZE,
+            fields=HISTORY_FIELDS,
+            columnar=True,
+        )
+ 
+    async def _run(self, input: GetTransactionHistoryToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        try:
+            result = await self.fetch(input)
+            return StringToolOutput(render_history(result, input.user, page=input.page))
+        except Exception as e:
+            logger.error(f"Error in GetTransactionHistoryTool: {e}")
+            raise ToolInputValidationError(f"Banking operation failed GetTransactionHistoryTool: {e}")
+ 
+ 
+class RequestLoanToolInput(BaseModel):
+    user: str
+    amount: Optional[float]
+ 
+class RequestLoanTool(Tool[RequestLoanToolInput, ToolRunOptions, StringToolOutput]):
+    name = "RequestLoanTool"
+    description = (
+        "Request a loan amount for a user"
+    )
+    input_schema = RequestLoanToolInput
+    read_only = False
+ 
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.bank_client = BankAPIClient()
+ 
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+ 
+    async def fetch(self, input: RequestLoanToolInput, occurrence: int = 0, scope: Optional[str] = None) -> dict[str, Any]:
+        if input.amount is None:
+            raise ToolInputValidationError("Amount is required for loan.")
+        key = idempotency_key(scope, "request-loan", input.user, input.amount, occurrence)
+        result = await asyncio.to_thread(self.bank_client.request_loan, input.user, input.amount, idempotency_key=key)
+        session_context.invalidate(input.user, ("loans",))
+        return result
+ 
+    async def _run(self, input: RequestLoanToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        try:
+            result = await self.fetch(input, scope=run_scope(context))
+            return StringToolOutput(render_loan(result))
+        except Exception as e:
+            logger.error(f"Error in RequestLoanTool: {e}")
+            raise ToolInputValidationError(f"Banking operation failed RequestLoanTool: {e}")
+
+
+class GetLoanStatusToolInput(BaseModel):
+    user: str
+
+
+class GetLoanStatusTool(Tool[GetLoanStatusToolInput, ToolRunOptions, StringToolOutput]):
+    name = "GetLoanStatusTool"
+    description = (
+        "Get the loans of a user and whether each one is pending, accepted or rejected"
+    )
+    input_schema = GetLoanStatusToolInput
+    read_only = True
+
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.bank_client = BankAPIClient()
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+
+    async def fetch(self, input: GetLoanStatusToolInput) -> dict[str, Any]:
+        cached = await session_context.prefetched("loans", input.user)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.bank_client.get_loans, input.user)
+
+    async def _run(self, input: GetLoanStatusToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        try:
+            result = await self.fetch(input)
+            return StringToolOutput(render_loans(result))
+        except Exception as e:
+            logger.error(f"Error in GetLoanStatusTool: {e}")
+            raise ToolInputValidationError(f"Banking operation failed GetLoanStatusTool: {e}")
+
+
+class BankOperationsToolInput(BaseModel):
+    operations: list[BankToolInput]
+
+
+class BankOperationsTool(Tool[BankOperationsToolInput, ToolRunOptions, StringToolOutput]):
+    name = "BankOperationsTool"
+    description = (
+        "Run several banking operations for a user in one call (e.g. balance + transaction history + loan). "
+        "Balance and history are fetched concurrently, transfers and loan requests run afterwards in the given order."
+    )
+    input_schema = BankOperationsToolInput
+    read_only = False
+
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        super().__init__(options)
+        self.tools = {
+            "get-balance": GetBalanceTool(),
+            "get-transaction-history": GetTransactionHistoryTool(),
+            "make-transfer": MakeTransferTool(),
+            "request-loan": RequestLoanTool(),
+            "get-loan-status": GetLoanStatusTool(),
+        }
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "bank"], creator=self)
+
+    async def _run_operation(self, operation: BankToolInput, occurrence: int = 0, scope: Optional[str] = None) -> Any:
+        tool = self.tools[operation.action]
+        # fetch() bypasses the tool run and its events, so the call is counted here
+        record_tool_call(tool.name)
+        # Writes repeated in the same call are distinct requests, each gets its own idempotency key
+        options = {} if tool.read_only else {"occurrence": occurrence, "scope": scope}
+        try:
+            return await tool.fetch(tool.input_schema.model_validate(operation.model_dump(exclude={"action"})), **options)
+        except Exception as e:
+            logger.error(f"Error in BankOperationsTool ({operation.action}): {e}")
+            return {"error": str(e)}
+
+    async def execute(self, operations: list[BankToolInput], scope: Optional[str] = None) -> list[Any]:
+        """
+        Run the operations and return the raw API results, in the order of `operations`. The writes
+        get the same idempotency keys when executed again with the same `scope`.
+        """
+        # Independent reads go out together, writes keep their order and only start once every read is done
+        reads = [(i, op) for i, op in enumerate(operations) if self.tools[op.action].read_only]
+        writes = [(i, op) for i, op in enumerate(operations) if not self.tools[op.action].read_only]
+
+        results: list[Any] = [None] * len(operations)
+        read_results = await asyncio.gather(*(self._run_operation(op) for _, op in reads))
+        for (i, _), result in zip(reads, read_results):
+            results[i] = result
+        for i, op in writes:
+            results[i] = await self._run_operation(op, occurrence=operations[:i].count(op), scope=scope)
+        return results
+
+    async def _run(self, input: BankOperationsToolInput, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        results = await self.execute(input.operations, scope=run_scope(context))
+        return StringToolOutput("\n\n".join(
+            f"[{op.action}]\n{render_operation(op, result)}" for op, result in zip(input.operations, results)
+        ))
+
+
+def render_operation(operation: BankToolInput, result: Any) -> str:
+    if operation.action == "get-balance":
+        return render_balance(result)
+    if operation.action == "get-transaction-history":
+        return render_history(result, operation.user)
+    if operation.action == "make-transfer":
+        return render_transfer(result)
+    if operation.action == "get-loan-status":
+        return render_loans(result)
+    return render_loan(result)
+
+
+# Tool name -> class
+TOOLS: dict[str, type[Tool]] = {
+    tool.name: tool
+    for tool in (
+        GetBalanceTool,
+        GetTransactionHistoryTool,
+        MakeTransferTool,
+        RequestLoanTool,
+        GetLoanStatusTool,
+        BankOperationsTool,
+        FAQSearchTool,
+        ScraperTool,
+    )
+}
+
+
+def create_tools(*names: str) -> list[Tool]:
+    """New instances of the tools called `names`."""
+    return [TOOLS[name]() for name in names]
+
+
+def run_scope(context: RunContext) -> str:
+    """
+    Idempotency scope of a tool call: the id shared by every run of the workflow or agent run it
+    belongs to, so the same write called again in the chat turn gets the same key.
+
+    The trade-off: the agent re-running a call (after a timeout, an error it retries, a step it
+    repeats) cannot be told apart from a second identical write the user asked for, both are
+    applied once. Writes repeated on purpose in one message go through BankOperationsTool, which
+    numbers the identical operations of a call (`occurrence`).
+    """
+    return context.group_id
@@ -0,0 +1,170 @@
+"""
+Replay a JSONL corpus of conversations against the `/chat` WebSocket and report turn latency.
+
+Each corpus line is {"id": ..., "lang": ..., "turns": ["first message", "follow-up", ...]}.
+Every simulated user opens its own session (with ?debug=1 so the server reports LLM and tool
+calls per turn) and replays conversations one after another.
+
+`/chat` does not stream: the answer arrives in a single frame once the turn is over, so the time
+to first token cannot be seen from the client and only the full turn latency is reported.
+
+The default corpus only reads (balances, histories, loans, FAQ). The conversations that send money
+or request loans are in benchmark_writes_corpus.jsonl and are only replayed with `--allow-writes`:
+they change the database being measured, every run drains the benchmark user's balance, so two
+runs with them are not comparable.
+
+    python benchmark.py --users 4 --repeat 2 --label react-granite --output results/react.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+import websockets
+
+DEFAULT_URL = "ws://localhost:8001/chat"
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus.jsonl")
+WRITES_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_writes_corpus.jsonl")
+
+
+def load_corpus(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = int(rank), min(int(rank) + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (rank - low), 1)
+
+
+def parse_event(frame: str) -> Optional[dict[str, Any]]:
+    """Typed JSON frame (turn_stats, balance_changed...), None for the answers."""
+    if not frame.startswith("{"):
+        return None
+    try:
+        data = json.loads(frame)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) and "type" in data else None
+
+
+async def run_turn(ws, conversation: dict[str, Any], turn_index: int, user_id: int, timeout: float) -> dict[str, Any]:
+    record: dict[str, Any] = {
+        "conversation": conversation["id"],
+        "lang": conversation.get("lang"),
+        "turn": turn_index,
+        "user": user_id,
+        "latency_ms": None,
+        "llm_calls": None,
+        "tool_calls": None,
+        "error": None,
+    }
+    started = time.perf_counter()
+    await ws.send(json.dumps({"content": conversation["turns"][turn_index]}))
+    try:
+        # The answer frame comes first, the turn ends with the server's turn_stats frame
+        while True:
+            frame = await asyncio.wait_for(ws.recv(), timeout=timeout)
+            elapsed = (time.perf_counter() - started) * 1000
+            event = parse_event(frame)
+            if event is not None and event["type"] != "turn_stats":
+                # Account events pushed by the server are not part of the answer
+                continue
+            stats = event
+            if stats is None:
+                if frame.startswith("Error:"):
+                    # The server ends the session after an error, no stats frame will follow
+                    record["error"] = frame
+                    record["latency_ms"] = round(elapsed, 1)
+                    return record
+                continue
+            record["latency_ms"] = round(elapsed, 1)
+            record["llm_calls"] = stats.get("llm_calls")
+            record["tool_calls"] = stats.get("tool_calls")
+            return record
+    except asyncio.TimeoutError:
+        record["error"] = f"timeout after {timeout}s"
+        return record
+
+
+async def simulate_user(
+    url: str, user: str, user_id: int, conversations: list[dict[str, Any]], timeout: float
+) -> list[dict[str, Any]]:
+    records = []
+    for conversation in conversations:
+        # One session per conversation, like a user opening the chat widget
+        query = urlencode({"user": user, "debug": "1"})
+        async with websockets.connect(f"{url}?{query}", max_size=None) as ws:
+            for turn_index in range(len(conversation["turns"])):
+                record = await run_turn(ws, conversation, turn_index, user_id, timeout)
+                records.append(record)
+                if record["error"]:
+                    break
+    return records
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
+    def column(name: str) -> list[float]:
+        return [r[name] for r in records if r[name] is not None]
+
+    summary: dict[str, Any] = {"turns": len(records), "errors": sum(1 for r in records if r["error"])}
+    summary["latency_ms"] = {f"p{p}": percentile(column("latency_ms"), p) for p in (50, 95, 99)}
+    for name in ("llm_calls", "tool_calls"):
+        values = column(name)
+        summary[f"{name}_per_turn"] = round(statistics.mean(values), 2) if values else None
+    return summary
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    corpus = load_corpus(args.corpus)
+    if args.allow_writes:
+        corpus += load_corpus(WRITES_CORPUS)
+    corpus = corpus * args.repeat
+    # Conversations are dealt round-robin so every user replays a similar mix
+    assignments = [corpus[i::args.users] for i in range(args.users)]
+    started = time.perf_counter()
+    per_user = await asyncio.gather(*(
+        simulate_user(args.url, args.user, user_id, conversations, args.timeout)
+        for user_id, conversations in enumerate(assignments)
+    ))
+    records = [record for user_records in per_user for record in user_records]
+    return {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {"url": args.url, "users": args.users, "repeat": args.repeat, "corpus": args.corpus, "allow_writes": args.allow_writes},
+        "wall_time_s": round(time.perf_counter() - started, 2),
+        "summary": summarize(records),
+        "turns": records,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a conversation corpus against the chat WebSocket.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--allow-writes", action="store_true", help=f"Also replay the transfers and loan requests of {os.path.basename(WRITES_CORPUS)}")
+    parser.add_argument("--user", default="John Doe", help="Bank user the sessions are opened for")
+    parser.add_argument("--users", type=int, default=1, help="Number of concurrent simulated users")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for one turn")
+    parser.add_argument("--label", default="default", help="Name of the configuration being measured")
+    parser.add_argument("--output", help="JSON file for the results (default: results/<label>-<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    output = args.output or os.path.join("results", f"{args.label}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(results["summary"], indent=2))
+    print(f"Results written to {output}")
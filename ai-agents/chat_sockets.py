@@ -1,22 +1,124 @@
 # websocket_router.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from beeai_framework.agents.errors import AgentError
 from beeai_framework.workflows.agent import AgentWorkflowInput
-from multi_test import create_workflow
+from multi_test import create_chat_model, create_workflow
+from structured_agent import StructuredBankAgent
+from speculative import AGENT_ROUTING, SpeculativeAgents
+from instrumentation import track_turn
+from deadline import DeadlineExceeded, expired, run_within_deadline, turn_deadline
+from account_events import account_events
+from session_context import SessionContext, current_session
+from langid import detect_language, response_instruction
 from beeai_framework.logger import Logger
+import asyncio
 import json
+import os
 import time
 router = APIRouter()
 logger = Logger(__name__)
 
+# "react" keeps the multi-agent ReAct workflow, "structured" answers transactional
+# requests with a single schema-constrained LLM call and falls back to the workflow otherwise
+BANK_AGENT_MODE = os.getenv("BANK_AGENT_MODE", "react")
+
+
+TIMEOUT_ANSWER = "Sorry, I could not finish answering in time. Please try again in a moment."
+
+
+def _out_of_budget(error: BaseException) -> bool:
+    """The turn deadline passed (any call may fail first), or an agent used up its iterations or retries."""
+    if expired():
+        return True
+    while error is not None:
+        if isinstance(error, (asyncio.TimeoutError, DeadlineExceeded, AgentError)):
+            return True
+        error = error.__cause__
+    return False
+
+
+async def answer_turn(user: str, user_input: str, workflow, structured_agent, speculative=None) -> str:
+    # Latest complete answer of an agent or of the structured path, the reply if the turn runs out of time
+    partial: list[str] = []
+    try:
+        return await run_within_deadline(_answer_turn(user, user_input, workflow, structured_agent, speculative, partial))
+    except Exception as e:
+        if not _out_of_budget(e):
+            raise
+        logger.warning(f"Turn out of time budget ({type(e).__name__}), answering with {'the partial answer' if partial else 'a fallback'}")
+        return partial[-1] if partial else TIMEOUT_ANSWER
+
+
+async def _answer_turn(user: str, user_input: str, workflow, structured_agent, speculative, partial: list[str]) -> str:
+    local_time = time.localtime()
+    date = time.strftime("%Y-%m-%d", local_time)
+    time_now = time.strftime("%H:%M", local_time)      
+    # Detected locally so the agents answer in the user's language, without a separate synthesis pass
+    language = detect_language(user_input)
+    logger.info("Detected language {}".format(language.name))
+
+    if structured_agent:
+        answer = await structured_agent.run(user_input, language, on_partial=partial.append)
+        if answer is not None:
+            logger.info("Structured response {}".format(answer))
+            return answer
+
+    if speculative and speculative.should_handle(user_input):
+        # Transactional and informational at once, or neither: both agents start without waiting on each other
+        logger.info("Ambiguous message, running the agents speculatively")
+        return await speculative.run(user_input, language, on_partial=partial.append)
+
+    result = await workflow.run(
+        inputs=[
+            AgentWorkflowInput(
+            prompt=f"""
+            You are assisting the user: {user}. Current date: {date}, time: {time_now}.
+            You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
+            Identify the user intent for this message: [USER MESSAGE START]{user_input}[USER MESSAGE END].
+            - If it's transactional (e.g., balance check, transfer, transaction history) respond.
+            
+            - {response_instruction(language)}
+            """
+            ),
+            AgentWorkflowInput(
+                    prompt=f"""
+                    You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
+                    Identify the user intent for this message: [USER MESSAGE START]{user_input}[USER MESSAGE END].
+                    - If it's informational or policy-related (e.g., about banking products, obligations, or procedures), route to BankInfoAgent.
+                    - If it's transactional, BankAgent already answered it above: return that answer unchanged.
+                
+                    - {response_instruction(language)}
+                    """
+                    ),
+        ]
+    ).on("success", lambda data, event: data.state.final_answer and partial.append(data.state.final_answer))
+    return result.result.final_answer
+
 
 @router.websocket("/chat")
 async def websocket_endpoint(websocket: WebSocket):
     user = websocket.query_params.get("user", "Anonymous")
+    # ?debug=1 adds a JSON "turn_stats" frame after every answer (used by benchmark.py)
+    debug = websocket.query_params.get("debug") == "1"
     print("WebSocket connection established")
 
     # 🟩 Initialize workflow ONCE globally
     workflow = create_workflow(user=user)
+    structured_agent = StructuredBankAgent(user=user, chat_model=create_chat_model()) if BANK_AGENT_MODE == "structured" else None
+    speculative = SpeculativeAgents(user=user, chat_model=create_chat_model()) if AGENT_ROUTING == "speculative" else None
+    # The user is known from the query string: load their banking context before the first message
+    session = SessionContext(user)
+    current_session.set(session)
+    session.prefetch()
     await websocket.accept()
+
+    async def push_event(event: dict) -> None:
+        # Typed JSON frames, the frontend tells them apart from the plain text answers
+        if event.get("type") == "balance_changed":
+            event = {**event, "balance": event["balances"].get(user)}
+        await websocket.send_text(json.dumps(event))
+
+    unsubscribe = account_events.subscribe(user, push_event)
     try:
         while True:
             inputt = await websocket.receive_text()
@@ -25,45 +127,23 @@ async def websocket_endpoint(websocket: WebSocket):
             if user_input == "_ping":
                 continue
             logger.info("user_input {}".format(user_input))
-            local_time = time.localtime()
-            date = time.strftime("%Y-%m-%d", local_time)
-            time_now = time.strftime("%H:%M", local_time)      
-        
-            result = await workflow.run(
-                inputs=[
-                    AgentWorkflowInput(
-                    prompt=f"""
-                    You are assisting the user: {user}. Current date: {date}, time: {time_now}.
-                    You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
-                    Identify the user intent for this message: [USER MESSAGE START]{user_input}[USER MESSAGE END].
-                    - If it's transactional (e.g., balance check, transfer, transaction history) respond.
-                    
-                    - Always respond with English.
-                    """
-                    ),
-                    AgentWorkflowInput(
-                            prompt=f"""
-                            You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
-                            Identify the user intent for this message: [USER MESSAGE START]{user_input}[USER MESSAGE END].
-                            - If it's informational or policy-related (e.g., about banking products, obligations, or procedures), route to BankInfoAgent.
-                        
-                            - Always respond with English.
-                            """
-                            ),
-                     AgentWorkflowInput(
-                            prompt=f"Summarize the response for {user_input}.",
-                            expected_output=f"A paragraph that respond to {user_input} with the same language of {user_input}.",
-                        ),
-                ]
-            )
+
+            with track_turn() as turn, turn_deadline():
+                # Refreshed while the LLM reads the message, the tools then find it ready
+                session.prefetch()
+                answer = await answer_turn(user, user_input, workflow, structured_agent, speculative)
 
             # Send final answer back
-            logger.info("Response {}".format(result.result.final_answer))
-            await websocket.send_text(result.result.final_answer)
+            logger.info("Response {}".format(answer))
+            await websocket.send_text(answer)
+            if debug:
+                await websocket.send_text(json.dumps(turn.to_dict()))
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
         import traceback
         traceback.print_exc()
-        await websocket.send_text(f"Error: {str(e)}")
\ No newline at end of file
+        await websocket.send_text(f"Error: {str(e)}")
+    finally:
+        unsubscribe()
@@ -0,0 +1,129 @@
+"""
+Per-turn deadline budget.
+
+`websocket_endpoint` opens every turn with `turn_deadline()`. The deadline lives in a ContextVar,
+so it follows the turn into the framework's run tasks and into the `asyncio.to_thread` workers of
+the tools. Everything on the chat path caps its own timeout with `timeout_for()`: the LLM requests,
+the bank API calls, the scraper and the FAQ query embedding. A timed out LLM request closes its
+connection, which stops the generation and frees the Ollama slot. Each agent run gets at most as
+many ReAct iterations as the time left can pay for, and `run_within_deadline` cuts whatever is
+still running when the budget is spent.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional, TypeVar
+
+from beeai_framework.agents.tool_calling.agent import ToolCallingAgent
+from beeai_framework.agents.types import AgentExecutionConfig
+from beeai_framework.backend.types import ChatModelInput
+
+T = TypeVar("T")
+
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))
+# Rough cost of one ReAct iteration (one LLM call and its tool calls), sizes the iteration budget
+SECONDS_PER_ITERATION = float(os.getenv("TURN_SECONDS_PER_ITERATION", "10"))
+MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "6"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# Below this many seconds left, a call is not worth starting
+MIN_TIMEOUT = 0.5
+
+# time.monotonic() at which the current turn must be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@contextmanager
+def turn_deadline(seconds: float = TURN_DEADLINE_SECONDS) -> Iterator[float]:
+    deadline = time.monotonic() + seconds
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current turn, None outside of a turn."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left < MIN_TIMEOUT
+
+
+def timeout_for(default: float) -> float:
+    """Timeout of a call made now: `default`, capped by the time left in the turn."""
+    if expired():
+        raise DeadlineExceeded("The turn deadline is exceeded")
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def iteration_budget(limit: int = MAX_ITERATIONS) -> int:
+    left = remaining()
+    if left is None:
+        return limit
+    return max(1, min(limit, int(left // SECONDS_PER_ITERATION)))
+
+
+def execution_config(**options: Any) -> AgentExecutionConfig:
+    """Execution config of an agent run starting now, its `max_iterations` capped by the time left."""
+    return AgentExecutionConfig(**options, max_iterations=iteration_budget())
+
+
+class DeadlineToolCallingAgent(ToolCallingAgent):
+    """
+    ToolCallingAgent whose runs get their execution config from `execution_config()` when they start.
+    AgentWorkflow.add_agent fixes the config of an agent step once, so the workflow agents are added
+    as instances of this class instead.
+    """
+
+    def __init__(self, *, execution: Optional[dict[str, Any]] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.execution = execution or {}
+
+    def run(self, prompt: Optional[str] = None, *, execution: Optional[AgentExecutionConfig] = None, **kwargs: Any) -> Any:
+        return super().run(prompt, execution=execution or execution_config(**self.execution), **kwargs)
+
+    async def clone(self) -> "DeadlineToolCallingAgent":
+        # The workflow clones the agent for every step and gives it the step memory, the model and
+        # the tools are shared like with the agents it builds from a config
+        cloned = DeadlineToolCallingAgent(llm=self._llm, tools=self._tools, execution=self.execution)
+        cloned._templates = self._templates
+        return cloned
+
+
+def _deadline_ollama_chat_model() -> type:
+    # The Ollama adapter imports litellm, the slowest import of the service by far
+    from beeai_framework.adapters.ollama.backend.chat import OllamaChatModel
+
+    class DeadlineOllamaChatModel(OllamaChatModel):
+        """Ollama chat model whose requests time out with the turn."""
+
+        def _transform_input(self, input: ChatModelInput) -> dict[str, Any]:
+            return super()._transform_input(input) | {"timeout": timeout_for(LLM_TIMEOUT)}
+
+    return DeadlineOllamaChatModel
+
+
+def __getattr__(name: str) -> Any:
+    # `from deadline import DeadlineOllamaChatModel` defines the class on first use
+    if name == "DeadlineOllamaChatModel":
+        globals()[name] = _deadline_ollama_chat_model()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def run_within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await `awaitable`, cancelled with asyncio.TimeoutError when the turn deadline passes."""
+    return await asyncio.wait_for(awaitable, remaining())
@@ -0,0 +1,393 @@
+"""
+Deterministic stand-in for the Ollama server, for offline load and regression testing.
+
+It serves the OpenAI compatible `/v1/chat/completions` endpoint that `ChatModel.from_name("ollama:...")`
+talks to, the native `/api/chat`, `/api/generate`, `/api/embed` and `/api/embeddings` endpoints,
+and answers with scripted or rule-based responses: tool calls for the banking tools (including the
+JSON tool calls the framework asks for through `response_format`), structured plans and final
+answers. Latency and token rate are configurable, so benchmarks measure the orchestration overhead
+of the service without a GPU or network.
+
+    python fake_ollama.py --port 11434 --ttft-ms 300 --ttft-sigma 0.3 --tokens-per-second 40
+    OLLAMA_API_BASE=http://localhost:11434 uvicorn main:app --port 8001
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIMENSION = 768
+
+INTENT_KEYWORDS = {
+    "transfer": ["send", "transfer", "envoyer", "virement", "نبعث", "ابعث", "تحويل", "b3ath", "ab3ath"],
+    "loan": ["loan", "prêt", "pret", "crédit", "credit", "قرض", "sellef", "9ardh"],
+    "history": ["history", "historique", "transactions", "سجل", "historique", "3amaliyet"],
+    "balance": ["balance", "solde", "argent", "money", "combien", "رصيد", "مال", "فلوس", "9adeh", "flous"],
+}
+FAQ_HINTS = ["?", "؟", "policy", "obligation", "taux", "rate", "document", "comment", "how", "what is", "chnowa"]
+
+_USER_RE = re.compile(r"assisting (?:the )?user:?\s*\"?([^\".\n]+)")
+_MESSAGE_RE = re.compile(r"\[USER MESSAGE START\](.*?)\[USER MESSAGE END\]", re.S)
+_AMOUNT_RE = re.compile(r"(\d+(?:[.,]\d+)?)")
+_RECEIVER_RE = re.compile(r"(?:to|à|a|لـ|ل)\s+([A-Z][\w]*(?:\s+[A-Z][\w]*)?)")
+
+
+class FakeModelConfig:
+    def __init__(
+        self,
+        ttft_ms: float = 200.0,
+        ttft_sigma: float = 0.25,
+        tokens_per_second: float = 50.0,
+        seed: int = 0,
+        script: Optional[list[dict[str, Any]]] = None,
+    ) -> None:
+        self.ttft_ms = ttft_ms
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.random = random.Random(seed)
+        self.script = [(re.compile(rule["match"], re.I), rule["response"]) for rule in script or []]
+
+    def first_token_delay(self) -> float:
+        """Lognormal time to first token (seconds) around the configured median."""
+        if self.ttft_ms <= 0:
+            return 0.0
+        return self.ttft_ms / 1000 * math.exp(self.random.gauss(0, self.ttft_sigma))
+
+    def token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def message_text(message: dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def classify(text: str) -> str:
+    lowered = text.lower()
+    for intent, keywords in INTENT_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return intent
+    return "faq" if any(hint in lowered for hint in FAQ_HINTS) else "none"
+
+
+# Output of the framework's own final_answer tool, not data an answer can be built from
+FINAL_ANSWER_TOOL = "final_answer"
+FINAL_ANSWER_OUTPUT = "Message has been sent"
+
+
+def answers_of(messages: list[dict[str, Any]]) -> list[str]:
+    """Answers given so far: assistant texts and the responses passed to the final_answer tool."""
+    answers = []
+    for message in messages:
+        if message.get("role") != "assistant":
+            continue
+        if message_text(message):
+            answers.append(message_text(message))
+        for call in message.get("tool_calls") or []:
+            if call.get("function", {}).get("name") == FINAL_ANSWER_TOOL:
+                try:
+                    response = json.loads(call["function"].get("arguments") or "{}").get("response")
+                except (json.JSONDecodeError, AttributeError):
+                    response = None
+                if response:
+                    answers.append(str(response))
+    return answers
+
+
+def tool_results_of(messages: list[dict[str, Any]]) -> list[str]:
+    """Outputs of the bank and FAQ tools in `messages`, without the final_answer acknowledgements."""
+    names = {
+        call.get("id"): call.get("function", {}).get("name")
+        for message in messages if message.get("role") == "assistant"
+        for call in message.get("tool_calls") or []
+    }
+    results = []
+    for message in messages:
+        if message.get("role") != "tool":
+            continue
+        name = message.get("name") or names.get(message.get("tool_call_id"))
+        text = message_text(message)
+        if text and name != FINAL_ANSWER_TOOL and text != FINAL_ANSWER_OUTPUT:
+            results.append(text)
+    return results
+
+
+def extract_context(messages: list[dict[str, Any]]) -> dict[str, Any]:
+    """Pull the user name, the raw user message and the latest tool result out of the conversation."""
+    all_text = "\n".join(message_text(m) for m in messages)
+    user_match = _USER_RE.search(all_text)
+    last_user = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), -1)
+    prompt = message_text(messages[last_user]) if last_user >= 0 else ""
+    quoted = _MESSAGE_RE.search(prompt)
+    user_message = (quoted.group(1) if quoted else prompt).strip()
+    tool_results = tool_results_of(messages[last_user + 1:])
+    # The second agent of the workflow sees the first one's answer as its final_answer call
+    previous_answers = answers_of(messages)
+    amount = _AMOUNT_RE.search(user_message)
+    receiver = _RECEIVER_RE.search(user_message)
+    return {
+        "user": user_match.group(1).strip() if user_match else "John Doe",
+        "message": user_message,
+        "intent": classify(user_message),
+        "tool_result": tool_results[-1] if tool_results else None,
+        "previous_answer": previous_answers[-1] if previous_answers else None,
+        "amount": float(amount.group(1).replace(",", ".")) if amount else None,
+        "receiver": receiver.group(1) if receiver else None,
+    }
+
+
+INTENT_TOOLS = {
+    "balance": "GetBalanceTool",
+    "history": "GetTransactionHistoryTool",
+    "transfer": "MakeTransferTool",
+    "loan": "RequestLoanTool",
+    "faq": "FAQSearchTool",
+}
+INTENT_ACTIONS = {
+    "balance": "get-balance",
+    "history": "get-transaction-history",
+    "transfer": "make-transfer",
+    "loan": "request-loan",
+}
+
+
+def fill_parameters(schema: dict[str, Any], ctx: dict[str, Any]) -> dict[str, Any]:
+    values = {
+        "user": ctx["user"],
+        "amount": ctx["amount"],
+        "receiver": ctx["receiver"],
+        "query": ctx["message"],
+        "url": "https://www.biat.com.tn/faq",
+        "page": 1,
+    }
+    properties = schema.get("properties", {})
+    return {name: values.get(name) for name in properties if name in values}
+
+
+def tool_schemas(schema: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Map tool name -> parameters schema from the framework's ToolCall union schema."""
+    variants = schema.get("anyOf") or schema.get("oneOf") or [schema]
+    tools = {}
+    for variant in variants:
+        name_schema = variant.get("properties", {}).get("name", {})
+        name = name_schema.get("const") or (name_schema.get("enum") or [None])[0]
+        if name:
+            tools[name] = variant.get("properties", {}).get("parameters", {})
+    return tools
+
+
+def final_answer(ctx: dict[str, Any]) -> str:
+    if ctx["tool_result"]:
+        return f"Here is what I found: {ctx['tool_result']}"
+    if ctx["previous_answer"]:
+        return ctx["previous_answer"]
+    return "I could not find an answer to your request."
+
+
+def respond(config: FakeModelConfig, messages: list[dict[str, Any]], response_format: Optional[dict[str, Any]], tools: Optional[list[dict[str, Any]]]) -> dict[str, Any]:
+    """Return {"content": str} or {"tool_calls": [...]} for a chat request."""
+    ctx = extract_context(messages)
+
+    for pattern, scripted in config.script:
+        if pattern.search(ctx["message"]):
+            return {"content": scripted if isinstance(scripted, str) else json.dumps(scripted)}
+
+    schema = (response_format or {}).get("json_schema", {}).get("schema") if response_format else None
+    if schema is not None:
+        available = tool_schemas(schema)
+        if available:
+            # Tool call forced through response_format: {"name": ..., "parameters": {...}}
+            tool = INTENT_TOOLS.get(ctx["intent"])
+            if ctx["tool_result"] is None and tool in available:
+                return {"content": json.dumps({"name": tool, "parameters": fill_parameters(available[tool], ctx)})}
+            return {"content": json.dumps({"name": "final_answer", "parameters": {"response": final_answer(ctx)}})}
+        if "operations" in schema.get("properties", {}):
+            action = INTENT_ACTIONS.get(ctx["intent"])
+            operations = [{"action": action, "amount": ctx["amount"], "receiver": ctx["receiver"]}] if action else []
+            return {"content": json.dumps({"operations": operations})}
+        return {"content": "{}"}
+
+    if tools:
+        names = {tool["function"]["name"]: tool["function"].get("parameters", {}) for tool in tools}
+        tool = INTENT_TOOLS.get(ctx["intent"])
+        if ctx["tool_result"] is None and tool in names:
+            return {"tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": tool, "arguments": json.dumps(fill_parameters(names[tool], ctx))},
+            }]}
+
+    answer = re.search(r"Answer:\s*(.*)", ctx["message"], re.S)
+    return {"content": answer.group(1).strip() if answer else final_answer(ctx)}
+
+
+def embed_text(text: str) -> list[float]:
+    """Deterministic bag-of-words embedding, texts sharing words get similar vectors."""
+    vector = np.zeros(EMBEDDING_DIMENSION, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        seed = int.from_bytes(hashlib.sha1(token.encode("utf-8")).digest()[:4], "little")
+        vector += np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSION).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def create_app(config: FakeModelConfig) -> FastAPI:
+    app = FastAPI(title="fake-ollama")
+
+    async def generate(messages: list[dict[str, Any]], response_format=None, tools=None) -> tuple[dict[str, Any], list[str]]:
+        await asyncio.sleep(config.first_token_delay())
+        reply = respond(config, messages, response_format, tools)
+        text = reply.get("content") or json.dumps(reply.get("tool_calls"))
+        # Roughly 4 characters per token, emitted at the configured rate
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+        return reply, pieces
+
+    def usage(messages: list[dict[str, Any]], pieces: list[str]) -> dict[str, int]:
+        prompt_tokens = sum(count_tokens(message_text(m)) for m in messages)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces), "total_tokens": prompt_tokens + len(pieces)}
+
+    @app.get("/")
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/tags")
+    @app.get("/v1/models")
+    async def models():
+        return {"models": [{"name": "fake", "model": "fake"}], "data": [{"id": "fake", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        reply, pieces = await generate(messages, body.get("response_format"), body.get("tools"))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.token_delay() * len(pieces))
+            message = {"role": "assistant", "content": reply.get("content")}
+            if "tool_calls" in reply:
+                message["tool_calls"] = reply["tool_calls"]
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if "tool_calls" in reply else "stop"}],
+                "usage": usage(messages, pieces),
+            })
+
+        async def stream():
+            for piece in pieces:
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(config.token_delay())
+            last = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage(messages, pieces)}
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def native_response(body: dict[str, Any], messages: list[dict[str, Any]], key: str):
+        response_format = None
+        if isinstance(body.get("format"), dict):
+            response_format = {"json_schema": {"schema": body["format"]}}
+        reply, pieces = await generate(messages, response_format, body.get("tools"))
+        base = {"model": body.get("model", "fake"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        stats = {"prompt_eval_count": sum(count_tokens(message_text(m)) for m in messages), "eval_count": len(pieces)}
+
+        def payload(text: str, done: bool) -> dict[str, Any]:
+            content = {"role": "assistant", "content": text} if key == "message" else text
+            data = {**base, key: content, "done": done}
+            if done:
+                data.update(stats)
+                if key == "message" and "tool_calls" in reply:
+                    data["message"]["tool_calls"] = [
+                        {"function": {"name": call["function"]["name"], "arguments": json.loads(call["function"]["arguments"])}}
+                        for call in reply["tool_calls"]
+                    ]
+            return data
+
+        if body.get("stream") is False:
+            await asyncio.sleep(config.token_delay() * len(pieces))
+            return JSONResponse(payload(reply.get("content") or "", True))
+
+        async def stream():
+            for piece in pieces if reply.get("content") else []:
+                yield json.dumps(payload(piece, False)) + "\n"
+                await asyncio.sleep(config.token_delay())
+            yield json.dumps(payload("", True)) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        return await native_response(body, body.get("messages", []), "message")
+
+    @app.post("/api/generate")
+    async def generate_endpoint(request: Request):
+        body = await request.json()
+        messages = [{"role": "system", "content": body.get("system", "")}, {"role": "user", "content": body.get("prompt", "")}]
+        return await native_response(body, messages, "response")
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return {"model": body.get("model", "fake"), "embeddings": [embed_text(text) for text in inputs]}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        return {"embedding": embed_text(body.get("prompt", ""))}
+
+    @app.post("/v1/embeddings")
+    async def openai_embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return {"object": "list", "model": body.get("model", "fake"),
+                "data": [{"object": "embedding", "index": i, "embedding": embed_text(text)} for i, text in enumerate(inputs)]}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a deterministic fake Ollama server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Median time to first token")
+    parser.add_argument("--ttft-sigma", type=float, default=0.25, help="Lognormal sigma of the time to first token, 0 for a constant")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Generation rate, 0 for instant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", help="JSONL file of {\"match\": regex, \"response\": text or object} rules checked first")
+    args = parser.parse_args()
+
+    rules = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            rules = [json.loads(line) for line in f if line.strip()]
+    fake_config = FakeModelConfig(args.ttft_ms, args.ttft_sigma, args.tokens_per_second, args.seed, rules)
+    uvicorn.run(create_app(fake_config), host=args.host, port=args.port)
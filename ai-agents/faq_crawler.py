@@ -0,0 +1,142 @@
+"""
+Incremental re-crawl of the FAQ sources listed in FAQs.txt.
+
+Each source is revalidated with a conditional request (If-None-Match / If-Modified-Since), an
+unchanged body (same content hash) is not parsed again, and only the chunks that actually changed
+are written to the FAQ store. HTML parsing runs in a process pool so it never blocks the event
+loop, and the retrieval index is rebuilt only when something changed, reusing the embeddings of
+unchanged chunks.
+
+    python faq_crawler.py --once
+    python faq_crawler.py --interval 86400
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from faq_index import FAQ_INDEX_DIR, FAQIndex, build_index
+from faq_ingest import FAQ_SOURCES_PATH, bank_from_url, load_sources, split_faq
+from faq_store import FAQ_STORE_PATH, FAQStore
+
+logger = logging.getLogger("FAQCrawler")
+
+PER_HOST_CONCURRENCY = int(os.getenv("FAQ_CRAWL_PER_HOST_CONCURRENCY", "2"))
+CRAWL_TIMEOUT = float(os.getenv("FAQ_CRAWL_TIMEOUT", "20"))
+PARSER_PROCESSES = int(os.getenv("FAQ_CRAWL_PARSER_PROCESSES", "2"))
+
+
+class FAQCrawler:
+    def __init__(
+        self,
+        store: FAQStore,
+        index_dir: str = FAQ_INDEX_DIR,
+        per_host_concurrency: int = PER_HOST_CONCURRENCY,
+        parser_processes: int = PARSER_PROCESSES,
+    ) -> None:
+        self.store = store
+        self.index_dir = index_dir
+        self.host_limits: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host_concurrency))
+        self.parser_processes = parser_processes
+
+    async def crawl_source(self, client: httpx.AsyncClient, pool: ProcessPoolExecutor, url: str) -> bool:
+        """Revalidate one source, returns True when its chunks changed."""
+        # The store is SQLite, its calls run in worker threads like the parsing and the index build
+        source = await asyncio.to_thread(self.store.get_source, url)
+        headers = {}
+        if source and source.etag:
+            headers["If-None-Match"] = source.etag
+        if source and source.last_modified:
+            headers["If-Modified-Since"] = source.last_modified
+
+        async with self.host_limits[urlparse(url).hostname]:
+            response = await client.get(url, headers=headers)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304:
+            logger.info(f"{url} not modified")
+            await asyncio.to_thread(self.store.touch_source, url, etag, last_modified)
+            return False
+        response.raise_for_status()
+
+        # Servers without validators still send the same bytes when nothing changed
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if source and source.content_hash == content_hash:
+            logger.info(f"{url} unchanged (same content hash)")
+            await asyncio.to_thread(self.store.touch_source, url, etag, last_modified)
+            return False
+
+        chunks = await asyncio.get_running_loop().run_in_executor(pool, split_faq, response.text, url)
+        added, removed = await asyncio.to_thread(
+            self.store.replace_source, url, bank_from_url(url), chunks, content_hash, etag, last_modified
+        )
+        logger.info(f"{url}: {added} chunks added, {removed} removed")
+        return bool(added or removed)
+
+    async def crawl(self, urls: list[str]) -> bool:
+        """Revalidate every source, re-index when one of them changed. Returns True when the index was rebuilt."""
+        async with httpx.AsyncClient(
+            timeout=CRAWL_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": "ElBankeji-FAQ-Crawler/1.0"},
+        ) as client:
+            with ProcessPoolExecutor(max_workers=self.parser_processes) as pool:
+                results = await asyncio.gather(
+                    *(self.crawl_source(client, pool, url) for url in urls), return_exceptions=True
+                )
+
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to crawl {url}: {result}")
+        changed = any(result is True for result in results)
+        if changed or not FAQIndex.exists(self.index_dir):
+            await asyncio.to_thread(build_index, self.store, self.index_dir)
+            return True
+        return False
+
+    async def run_forever(self, urls: list[str], interval: float) -> None:
+        while True:
+            try:
+                await self.crawl(urls)
+            except Exception as e:
+                logger.error(f"FAQ crawl failed: {e}")
+            # Jitter so several replicas do not hit the bank sites at the same time
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+
+def start_background_recrawl(interval: Optional[float] = None) -> Optional[asyncio.Task]:
+    """Start the periodic re-crawl on the running loop when FAQ_RECRAWL_INTERVAL (seconds) is set."""
+    interval = interval or float(os.getenv("FAQ_RECRAWL_INTERVAL", "0"))
+    if not interval:
+        return None
+    if not os.path.exists(FAQ_SOURCES_PATH):
+        logger.error(f"FAQ re-crawl disabled, sources file {FAQ_SOURCES_PATH} not found")
+        return None
+    crawler = FAQCrawler(FAQStore())
+    return asyncio.create_task(crawler.run_forever(load_sources(), interval))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Incrementally re-crawl the FAQ sources.")
+    parser.add_argument("--sources", default=FAQ_SOURCES_PATH)
+    parser.add_argument("--store", default=FAQ_STORE_PATH)
+    parser.add_argument("--index", default=FAQ_INDEX_DIR)
+    parser.add_argument("--interval", type=float, default=24 * 3600, help="Seconds between two crawls")
+    parser.add_argument("--once", action="store_true", help="Crawl once and exit")
+    args = parser.parse_args()
+
+    faq_crawler = FAQCrawler(FAQStore(args.store), args.index)
+    if args.once:
+        asyncio.run(faq_crawler.crawl(load_sources(args.sources)))
+    else:
+        asyncio.run(faq_crawler.run_forever(load_sources(args.sources), args.interval))
@@ -0,0 +1,326 @@
+"""
+Hybrid BM25 + dense retrieval index over the FAQ chunks of the local FAQ store.
+
+The index is a directory of plain `.npy` files (postings, document lengths, idf and the
+normalized `nomic-embed-text` embedding matrix) that are opened with `mmap_mode="r"`, so loading
+it at startup is zero-copy and scoring a query is a handful of vectorized NumPy operations.
+
+Every build goes to a new `<index_dir>.<version>` directory and `index_dir` is a symlink to the
+current one, switched with a single rename: a reader, or a crash during a rebuild, always finds
+a complete index.
+
+    python faq_index.py build
+    python faq_index.py query "est-ce que la BIAT emet des obligations ?"
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import requests
+
+from deadline import timeout_for
+from faq_store import FAQ_STORE_PATH, FAQChunk, FAQStore
+
+logger = logging.getLogger("FAQIndex")
+
+FAQ_INDEX_DIR = os.getenv("FAQ_INDEX_DIR", os.path.join(os.path.dirname(FAQ_STORE_PATH), "faq_index"))
+EMBEDDING_MODEL = os.getenv("FAQ_EMBEDDING_MODEL", "nomic-embed-text")
+OLLAMA_API_BASE = os.getenv("OLLAMA_API_BASE", "http://host.docker.internal:11434")
+EMBEDDING_BATCH_SIZE = 64
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal rank fusion constant and number of candidates taken from each ranking
+RRF_K = 60
+FUSION_CANDIDATES = 50
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "the", "and", "for", "are", "you", "your", "can", "what", "how", "does", "with", "this", "that",
+    "les", "des", "une", "est", "que", "qui", "pour", "dans", "par", "sur", "pas", "vous", "votre", "mon",
+    "elle", "il", "je", "la", "le", "de", "du", "un", "et", "en", "au", "aux", "ce", "ou",
+    "في", "من", "على", "ما", "هل", "عن",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, strip accents (épargne -> epargne) and drop stopwords and one-letter tokens."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in _TOKEN_RE.findall(text) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def embed(texts: list[str], prefix: str) -> np.ndarray:
+    """Embed `texts` with Ollama, nomic-embed-text expects a task prefix on every input."""
+    response = requests.post(
+        f"{OLLAMA_API_BASE.rstrip('/')}/api/embed",
+        json={"model": EMBEDDING_MODEL, "input": [f"{prefix}: {text}" for text in texts]},
+        timeout=timeout_for(120),
+    )
+    response.raise_for_status()
+    vectors = np.asarray(response.json()["embeddings"], dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _embed_chunks(chunks: list[FAQChunk], previous_index_dir: str) -> np.ndarray:
+    """Embed `chunks`, reusing the vectors of the previous index for chunks that did not change."""
+    previous: dict[str, np.ndarray] = {}
+    if FAQIndex.exists(previous_index_dir):
+        index = FAQIndex(previous_index_dir)
+        if index.embeddings is not None and index.meta.get("embedding_model") == EMBEDDING_MODEL:
+            # Keyed by content hash, SQLite may hand the id of a deleted chunk to a new one
+            hashes = index.meta.get("chunk_hashes", [])
+            previous = {chunk_hash: np.array(index.embeddings[row]) for row, chunk_hash in enumerate(hashes)}
+
+    vectors: list[Optional[np.ndarray]] = [previous.get(chunk.hash) for chunk in chunks]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    logger.info(f"Embedding {len(missing)} new chunks, reusing {len(chunks) - len(missing)}")
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        texts = [f"{chunks[i].question}\n{chunks[i].answer}" for i in batch]
+        for i, vector in zip(batch, embed(texts, prefix="search_document")):
+            vectors[i] = vector
+    return np.stack(vectors).astype(np.float32)
+
+
+def build_index(store: FAQStore, index_dir: str = FAQ_INDEX_DIR, with_embeddings: bool = True) -> int:
+    """Build the index from every chunk of `store` and atomically make it the one `index_dir` points to."""
+    chunks = store.all_chunks()
+    documents = [tokenize(f"{chunk.question} {chunk.answer}") for chunk in chunks]
+
+    vocab: dict[str, int] = {}
+    postings: dict[int, list[tuple[int, int]]] = {}
+    for doc_id, tokens in enumerate(documents):
+        for term, tf in Counter(tokens).items():
+            term_id = vocab.setdefault(term, len(vocab))
+            postings.setdefault(term_id, []).append((doc_id, tf))
+
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    doc_ids, term_freqs = [], []
+    for term_id in range(len(vocab)):
+        entries = postings[term_id]
+        offsets[term_id + 1] = offsets[term_id] + len(entries)
+        doc_ids.extend(doc for doc, _ in entries)
+        term_freqs.extend(tf for _, tf in entries)
+
+    n_docs = len(chunks)
+    doc_freq = np.diff(offsets).astype(np.float32)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+    doc_lengths = np.asarray([len(tokens) for tokens in documents], dtype=np.float32)
+
+    tmp_dir = f"{index_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "chunk_ids.npy"), np.asarray([chunk.id for chunk in chunks], dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "doc_ids.npy"), np.asarray(doc_ids, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, "term_freqs.npy"), np.asarray(term_freqs, dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "doc_lengths.npy"), doc_lengths)
+    np.save(os.path.join(tmp_dir, "idf.npy"), idf)
+
+    has_embeddings = False
+    if with_embeddings and chunks:
+        try:
+            embeddings = _embed_chunks(chunks, index_dir)
+            np.save(os.path.join(tmp_dir, "embeddings.npy"), embeddings)
+            has_embeddings = True
+        except Exception as e:
+            logger.error(f"Embedding failed, the index will be BM25 only: {e}")
+
+    with open(os.path.join(tmp_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "documents": n_docs,
+            "avg_doc_length": float(doc_lengths.mean()) if n_docs else 0.0,
+            "embedding_model": EMBEDDING_MODEL if has_embeddings else None,
+            "chunk_hashes": [chunk.hash for chunk in chunks],
+        }, f)
+
+    _publish(tmp_dir, index_dir)
+    logger.info(f"Indexed {n_docs} chunks, {len(vocab)} terms, embeddings={has_embeddings}")
+    return n_docs
+
+def _publish(tmp_dir: str, index_dir: str) -> None:
+    """Switch the `index_dir` symlink to the freshly built `tmp_dir` and drop the older versions."""
+    index_dir = os.path.abspath(index_dir)
+    version_dir = f"{index_dir}.{time.time_ns()}"
+    os.rename(tmp_dir, version_dir)
+    if os.path.isdir(index_dir) and not os.path.islink(index_dir):
+        # Index built before versioned directories, moved aside once to make room for the symlink
+        os.rename(index_dir, f"{index_dir}.0")
+
+    link = f"{index_dir}.link"
+    if os.path.lexists(link):
+        os.remove(link)
+    # Relative target, the data directory is mounted at different paths in and out of the container
+    os.symlink(os.path.basename(version_dir), link)
+    previous = os.path.realpath(index_dir) if os.path.islink(index_dir) else None
+    os.replace(link, index_dir)
+
+    # The previous version stays for the readers that resolved the link just before the switch,
+    # readers that already loaded an older one keep their memory maps of the deleted files
+    parent, name = os.path.split(index_dir)
+    keep = {version_dir, previous}
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(f"{name}.") and suffix.isdigit() and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class FAQIndex:
+    """Read-only, memory-mapped hybrid index built by `build_index`."""
+
+    def __init__(self, index_dir: str = FAQ_INDEX_DIR) -> None:
+        self.index_dir = index_dir
+        # Resolved once, every file is read from the same version even if a rebuild switches the link meanwhile
+        self.path = os.path.realpath(index_dir)
+        self.version = self._version(index_dir)
+        with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(self.path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab: dict[str, int] = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+        self.chunk_ids = load("chunk_ids.npy")
+        self.offsets = load("offsets.npy")
+        self.doc_ids = load("doc_ids.npy")
+        self.term_freqs = load("term_freqs.npy")
+        self.doc_lengths = load("doc_lengths.npy")
+        self.idf = load("idf.npy")
+        self.embeddings = load("embeddings.npy") if self.meta.get("embedding_model") else None
+
+        avg_doc_length = self.meta["avg_doc_length"] or 1.0
+        # Per-document BM25 length normalization, computed once instead of per query
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(self.doc_lengths) / avg_doc_length)
+
+    @classmethod
+    def exists(cls, index_dir: str = FAQ_INDEX_DIR) -> bool:
+        return os.path.exists(os.path.join(index_dir, "meta.json"))
+
+    @staticmethod
+    def _version(index_dir: str) -> tuple[str, int]:
+        path = os.path.realpath(index_dir)
+        return path, os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+
+    def is_stale(self) -> bool:
+        try:
+            return self._version(self.index_dir) != self.version
+        except FileNotFoundError:
+            return False
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        term_ids = [self.vocab[token] for token in tokenize(query) if token in self.vocab]
+        if not term_ids:
+            return np.zeros(len(self.chunk_ids), dtype=np.float32)
+
+        starts, stops = self.offsets[term_ids], self.offsets[np.asarray(term_ids) + 1]
+        docs = np.concatenate([self.doc_ids[start:stop] for start, stop in zip(starts, stops)])
+        tfs = np.concatenate([self.term_freqs[start:stop] for start, stop in zip(starts, stops)])
+        idfs = np.repeat(self.idf[term_ids], stops - starts)
+
+        contributions = idfs * tfs * (BM25_K1 + 1) / (tfs + self.length_norm[docs])
+        return np.bincount(docs, weights=contributions, minlength=len(self.chunk_ids))
+
+    def dense_scores(self, query_vector: np.ndarray) -> np.ndarray:
+        return self.embeddings @ query_vector
+
+    def search(self, query: str, k: int = 5, query_vector: Optional[np.ndarray] = None) -> list[tuple[int, float]]:
+        """Return `(chunk_id, fused_score)` for the best `k` chunks, fusing BM25 and dense rankings with RRF."""
+        n_docs = len(self.chunk_ids)
+        if n_docs == 0:
+            return []
+
+        rankings = []
+        bm25 = self.bm25_scores(query)
+        if bm25.any():
+            ranking = _top(bm25, FUSION_CANDIDATES)
+            rankings.append(ranking[bm25[ranking] > 0])
+        if self.embeddings is not None:
+            if query_vector is None:
+                query_vector = embed_query(query)
+            if query_vector is not None:
+                rankings.append(_top(self.dense_scores(query_vector), FUSION_CANDIDATES))
+
+        fused = np.zeros(n_docs, dtype=np.float32)
+        for ranking in rankings:
+            fused[ranking] += 1.0 / (RRF_K + np.arange(1, len(ranking) + 1))
+        best = [doc for doc in _top(fused, k) if fused[doc] > 0]
+        return [(int(self.chunk_ids[doc]), float(fused[doc])) for doc in best]
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first, without sorting the whole array."""
+    k = min(k, len(scores))
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+@lru_cache(maxsize=1024)
+def _embed_query_cached(query: str) -> tuple[float, ...]:
+    return tuple(embed([query], prefix="search_query")[0].tolist())
+
+
+def embed_query(query: str) -> Optional[np.ndarray]:
+    # Failures (Ollama down, turn deadline reached) are not cached, the next query tries again
+    try:
+        vector = _embed_query_cached(query)
+    except Exception as e:
+        logger.error(f"Query embedding failed, falling back to BM25 only: {e}")
+        return None
+    return np.asarray(vector, dtype=np.float32)
+
+
+class FAQRetriever:
+    """Search FAQ chunks through the hybrid index, or through the store's full-text index when no index is built."""
+
+    def __init__(self, store: FAQStore, index_dir: str = FAQ_INDEX_DIR) -> None:
+        self.store = store
+        self.index_dir = index_dir
+        self.index: Optional[FAQIndex] = None
+
+    def _current_index(self) -> Optional[FAQIndex]:
+        if (self.index is None or self.index.is_stale()) and FAQIndex.exists(self.index_dir):
+            self.index = FAQIndex(self.index_dir)
+        return self.index
+
+    def search(self, query: str, bank: Optional[str] = None, k: int = 5) -> list[FAQChunk]:
+        index = self._current_index()
+        if index is None:
+            return self.store.search(query, bank=bank, limit=k)
+        # Over-fetch when filtering by bank, the filter is applied on the fused ranking
+        hits = index.search(query, k=k * 4 if bank else k)
+        chunks = self.store.get_chunks([chunk_id for chunk_id, _ in hits])
+        if bank:
+            chunks = [chunk for chunk in chunks if chunk.bank == bank.lower()]
+        return chunks[:k]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build or query the hybrid FAQ retrieval index.")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("text", nargs="?", help="Query text for the `query` command")
+    parser.add_argument("--store", default=FAQ_STORE_PATH)
+    parser.add_argument("--index", default=FAQ_INDEX_DIR)
+    parser.add_argument("--no-embeddings", action="store_true", help="Build a BM25 only index")
+    args = parser.parse_args()
+
+    faq_store = FAQStore(args.store)
+    if args.command == "build":
+        build_index(faq_store, args.index, with_embeddings=not args.no_embeddings)
+    else:
+        for chunk in FAQRetriever(faq_store, args.index).search(args.text or ""):
+            print(chunk.render(), end="\n\n")
@@ -0,0 +1,132 @@
+"""
+Offline ingestion of the bank FAQ pages listed in FAQs.txt into the local FAQ store.
+
+    python faq_ingest.py --sources FAQs.txt --store data/faq.sqlite3
+
+The hybrid retrieval index (see faq_index.py) is rebuilt at the end of the ingestion.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from faq_index import FAQ_INDEX_DIR, build_index
+from faq_store import FAQ_STORE_PATH, FAQChunk, FAQStore
+
+logger = logging.getLogger("FAQIngest")
+
+# Next to the code, so it is part of the image and of the /app mount of docker-compose.yml
+FAQ_SOURCES_PATH = os.getenv("FAQ_SOURCES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "FAQs.txt"))
+
+# Several hosts belong to the same bank (e.g. online banking portals)
+BANK_ALIASES = {
+    "mybiat": "biat",
+    "bank-abc": "abc",
+    "banquezitouna": "zitouna",
+}
+
+_ARABIC_RE = re.compile(r"[؀-ۿ]")
+_QUESTION_END = ("?", "؟")
+_NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "form", "svg", "iframe"]
+
+
+def load_sources(path: str = FAQ_SOURCES_PATH) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def bank_from_url(url: str) -> str:
+    labels = urlparse(url).hostname.split(".")
+    labels = [label for label in labels if label not in ("www", "online", "com", "tn", "fr")]
+    name = labels[0] if labels else urlparse(url).hostname
+    return BANK_ALIASES.get(name, name)
+
+
+def detect_page_lang(url: str, soup: BeautifulSoup, text: str) -> str:
+    path = urlparse(url).path.lower()
+    if "/fr/" in path or path.startswith("/fr"):
+        return "fr"
+    if "/ar/" in path or path.startswith("/ar"):
+        return "ar"
+    html = soup.find("html")
+    if html and html.get("lang"):
+        return html["lang"].split("-")[0].lower()
+    if text and len(_ARABIC_RE.findall(text)) > len(text) * 0.3:
+        return "ar"
+    return "fr"
+
+
+def split_faq(html: str, url: str) -> list[FAQChunk]:
+    """
+    Split an FAQ page into question/answer chunks.
+
+    Bank FAQ pages use very different markup (accordions, definition lists, headings), so the
+    page is flattened into text lines: a line ending with a question mark opens a new chunk and
+    the following lines, up to the next question, are its answer.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(_NOISE_TAGS):
+        tag.decompose()
+
+    lines = [re.sub(r"\s+", " ", line).strip() for line in soup.get_text("\n").splitlines()]
+    lines = [line for line in lines if line]
+    lang = detect_page_lang(url, soup, " ".join(lines[:200]))
+    bank = bank_from_url(url)
+
+    chunks: list[FAQChunk] = []
+    question: Optional[str] = None
+    answer: list[str] = []
+    for line in lines + ["?"]:
+        if line.endswith(_QUESTION_END):
+            if question and answer:
+                chunks.append(FAQChunk(url=url, bank=bank, lang=lang, question=question, answer=" ".join(answer)))
+            question, answer = line, []
+        elif question:
+            answer.append(line)
+    return chunks
+
+
+def fetch_html(url: str, timeout: float = 20.0) -> str:
+    response = requests.get(url, timeout=timeout, headers={"User-Agent": "ElBankeji-FAQ-Ingest/1.0"})
+    response.raise_for_status()
+    return response.text
+
+
+def ingest_html(store: FAQStore, url: str, html: str) -> int:
+    chunks = split_faq(html, url)
+    content_hash = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    store.replace_source(url, bank_from_url(url), chunks, content_hash)
+    logger.info(f"Ingested {len(chunks)} chunks from {url}")
+    return len(chunks)
+
+
+def ingest(store: FAQStore, urls: list[str], fetch: Callable[[str], str] = fetch_html) -> dict[str, int]:
+    """Fetch every source once and store its chunks, a failing source keeps its previous chunks."""
+    counts = {}
+    for url in urls:
+        try:
+            counts[url] = ingest_html(store, url, fetch(url))
+        except Exception as e:
+            logger.error(f"Failed to ingest {url}: {e}")
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Fetch the FAQ sources and store their question/answer chunks locally.")
+    parser.add_argument("--sources", default=FAQ_SOURCES_PATH, help="File with one FAQ URL per line")
+    parser.add_argument("--store", default=FAQ_STORE_PATH, help="Path of the SQLite FAQ store")
+    parser.add_argument("--index", default=FAQ_INDEX_DIR, help="Directory of the hybrid retrieval index")
+    parser.add_argument("--no-embeddings", action="store_true", help="Build a BM25 only index")
+    args = parser.parse_args()
+
+    faq_store = FAQStore(args.store)
+    results = ingest(faq_store, load_sources(args.sources))
+    print(f"Ingested {sum(results.values())} chunks from {len(results)} sources into {args.store}")
+    build_index(faq_store, args.index, with_embeddings=not args.no_embeddings)
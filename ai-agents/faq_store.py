@@ -0,0 +1,210 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+FAQ_STORE_PATH = os.getenv("FAQ_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "faq.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    url TEXT PRIMARY KEY,
+    bank TEXT NOT NULL,
+    content_hash TEXT,
+    fetched_at TEXT,
+    etag TEXT,
+    last_modified TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL REFERENCES sources(url),
+    bank TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_url_idx ON chunks(url);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    question, answer, content='chunks', content_rowid='id'
+);
+"""
+
+# Columns added after the first release of the store, created on open for older files
+_MIGRATIONS = {
+    "sources": {"etag": "TEXT", "last_modified": "TEXT"},
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class FAQChunk(BaseModel):
+    """One question/answer pair extracted from a bank FAQ page."""
+    url: str
+    bank: str
+    lang: str
+    question: str
+    answer: str
+    id: Optional[int] = None
+
+    @property
+    def hash(self) -> str:
+        return hashlib.sha1(f"{self.question}\n{self.answer}".encode("utf-8")).hexdigest()
+
+    def render(self, max_answer_chars: int = 600) -> str:
+        answer = self.answer if len(self.answer) <= max_answer_chars else self.answer[:max_answer_chars].rstrip() + "..."
+        return f"Q: {self.question}\nA: {answer}\n(source: {self.bank}, {self.lang}, {self.url})"
+
+
+class FAQSource(BaseModel):
+    """Crawl state of one FAQ page, used for conditional requests."""
+    url: str
+    bank: str
+    content_hash: Optional[str] = None
+    fetched_at: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class FAQStore:
+    """
+    Local on-disk store of FAQ chunks, filled offline by `faq_ingest.py`.
+
+    Reads are plain SQLite queries, so tools can answer policy questions in milliseconds
+    instead of downloading and parsing the bank pages on every call. The connection is shared by
+    the `asyncio.to_thread` workers of the tools and the crawler's threads, every use of it holds
+    `lock`.
+    """
+
+    def __init__(self, path: str = FAQ_STORE_PATH) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def _migrate(self) -> None:
+        for table, columns in _MIGRATIONS.items():
+            existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self.conn.commit()
+
+    def get_source(self, url: str) -> Optional[FAQSource]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM sources WHERE url = ?", (url,)).fetchone()
+        return FAQSource(**dict(row)) if row else None
+
+    def touch_source(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Record that `url` was checked and did not change."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE sources SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url = ?",
+                (datetime.utcnow().isoformat(), etag, last_modified, url),
+            )
+
+    def replace_source(
+        self,
+        url: str,
+        bank: str,
+        chunks: list[FAQChunk],
+        content_hash: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> tuple[int, int]:
+        """
+        Atomically replace the chunks of `url` with `chunks`.
+
+        Chunks whose content did not change are kept with their id, so the retrieval index can
+        reuse their embeddings. Returns the number of added and removed chunks.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO sources (url, bank, content_hash, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET bank = excluded.bank, content_hash = excluded.content_hash, "
+                "fetched_at = excluded.fetched_at, etag = excluded.etag, last_modified = excluded.last_modified",
+                (url, bank, content_hash, datetime.utcnow().isoformat(), etag, last_modified),
+            )
+            new_chunks = {chunk.hash: chunk for chunk in chunks}
+            existing = self.conn.execute("SELECT id, question, answer, hash FROM chunks WHERE url = ?", (url,)).fetchall()
+
+            removed = [row for row in existing if row["hash"] not in new_chunks]
+            for row in removed:
+                self.conn.execute(
+                    "INSERT INTO chunks_fts (chunks_fts, rowid, question, answer) VALUES ('delete', ?, ?, ?)",
+                    (row["id"], row["question"], row["answer"]),
+                )
+                self.conn.execute("DELETE FROM chunks WHERE id = ?", (row["id"],))
+
+            kept = {row["hash"] for row in existing} & new_chunks.keys()
+            added = [chunk for chunk_hash, chunk in new_chunks.items() if chunk_hash not in kept]
+            for chunk in added:
+                cursor = self.conn.execute(
+                    "INSERT INTO chunks (url, bank, lang, question, answer, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, chunk.bank, chunk.lang, chunk.question, chunk.answer, chunk.hash),
+                )
+                self.conn.execute(
+                    "INSERT INTO chunks_fts (rowid, question, answer) VALUES (?, ?, ?)",
+                    (cursor.lastrowid, chunk.question, chunk.answer),
+                )
+        return len(added), len(removed)
+
+    def chunks_for_url(self, url: str) -> list[FAQChunk]:
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM chunks WHERE url = ? ORDER BY id", (url,)).fetchall()
+        return [self._to_chunk(row) for row in rows]
+
+    def all_chunks(self) -> list[FAQChunk]:
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM chunks ORDER BY id").fetchall()
+        return [self._to_chunk(row) for row in rows]
+
+    def get_chunks(self, ids: list[int]) -> list[FAQChunk]:
+        """Return the chunks with the given ids, in the order of `ids`."""
+        if not ids:
+            return []
+        placeholders = ",".join("?" for _ in ids)
+        with self.lock:
+            rows = {row["id"]: row for row in self.conn.execute(f"SELECT * FROM chunks WHERE id IN ({placeholders})", ids)}
+        return [self._to_chunk(rows[chunk_id]) for chunk_id in ids if chunk_id in rows]
+
+    def search(self, query: str, bank: Optional[str] = None, limit: int = 5) -> list[FAQChunk]:
+        """Full-text search over questions and answers, best matches first."""
+        tokens = _TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        match = " OR ".join(f'"{token}"' for token in tokens)
+        sql = (
+            "SELECT chunks.* FROM chunks_fts JOIN chunks ON chunks.id = chunks_fts.rowid "
+            "WHERE chunks_fts MATCH ?"
+        )
+        params: list = [match]
+        if bank:
+            sql += " AND chunks.bank = ?"
+            params.append(bank.lower())
+        sql += " ORDER BY bm25(chunks_fts) LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._to_chunk(row) for row in rows]
+
+    @staticmethod
+    def _to_chunk(row: sqlite3.Row) -> FAQChunk:
+        return FAQChunk(
+            id=row["id"], url=row["url"], bank=row["bank"], lang=row["lang"], question=row["question"], answer=row["answer"]
+        )
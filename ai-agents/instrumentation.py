@@ -0,0 +1,283 @@
+"""
+Prometheus metrics and per-turn stats of the agents, LLM requests and tool calls.
+
+`install()` subscribes a listener to every framework event. The run emitter brackets each agent,
+model and tool execution with start and finish events, the time between them is the stage
+duration; `track_turn()` gathers the stages of one chat turn for the answer's `turn_stats`.
+A run cancelled again while it emits its events never sends "finish", its entries are dropped
+when its turn ends.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from beeai_framework.emitter.emitter import Emitter, EventMeta
+
+# Stats of the chat turn being processed by the current task, emitter callbacks run in tasks
+# created from the emitting coroutine so they see the turn of the session that triggered them
+current_turn: ContextVar[Optional["TurnStats"]] = ContextVar("current_turn", default=None)
+
+# Prometheus default buckets, stretched to the tens of seconds a local model can take
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Namespace of the run emitter -> stage reported in the metrics
+STAGES = {"agent": "agent", "backend": "llm", "tool": "tool", "workflow": "workflow"}
+
+_installed = False
+
+
+class Histogram:
+    """Cumulative histogram with one series per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DURATION_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series: dict[tuple[tuple[str, str], ...], list[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            # bucket counts, then sum and count
+            series = self.series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(key, le=str(bound))} {count:g}")
+                lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {series[-1]:g}")
+                lines.append(f"{self.name}_sum{_labels(key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_labels(key)} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.series: dict[tuple[tuple[str, str], ...], float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        with self.lock:
+            self.series[tuple(sorted(labels.items()))] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            lines += [f"{self.name}{_labels(key)} {value:g}" for key, value in sorted(self.series.items())]
+        return lines
+
+
+def _labels(key: tuple[tuple[str, str], ...], **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+STAGE_DURATION = Histogram("elbankeji_stage_duration_seconds", "Duration of agent, LLM and tool runs.")
+TURN_DURATION = Histogram("elbankeji_turn_duration_seconds", "Duration of a chat turn, from message to answer.")
+LLM_TOKENS = Counter("elbankeji_llm_tokens_total", "Tokens processed by the chat model.")
+RETRIES = Counter("elbankeji_retries_total", "Retries of agent and tool runs.")
+ERRORS = Counter("elbankeji_errors_total", "Failed agent, LLM and tool runs.")
+PREFETCH = Counter("elbankeji_prefetch_total", "Bank reads of the tools served from the prefetched session context (hit) or not (miss).")
+METRICS = [STAGE_DURATION, TURN_DURATION, LLM_TOKENS, RETRIES, ERRORS, PREFETCH]
+
+
+class TurnStats:
+    """LLM and tool call counts of one chat turn, with the duration of every stage."""
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.started_at = time.perf_counter()
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.tools: list[str] = []
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.stages: list[dict[str, Any]] = []
+
+    @property
+    def duration(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": "turn_stats",
+            "duration_ms": round(self.duration * 1000, 1),
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "tools": self.tools,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "stages": self.stages,
+        }
+
+
+class _RunTimer:
+    def __init__(self, stage: str, name: str, turn: Optional[TurnStats]) -> None:
+        self.stage = stage
+        self.name = name
+        self.turn = turn
+        self.started_at = time.perf_counter()
+        self.failed = False
+
+
+# Runs started and not finished yet, by run id
+_running: dict[str, _RunTimer] = {}
+# Nested runs pipe their events to the parent emitter, so the root listener sees them once per
+# ancestor; remember the last event ids to handle each event once
+_seen: "OrderedDict[str, None]" = OrderedDict()
+_SEEN_SIZE = 4096
+# Current step of every running workflow, AgentWorkflow agents are unnamed so they take the step name
+_workflow_steps: dict[str, str] = {}
+
+
+def _stage_of(path: str) -> Optional[str]:
+    """"run.tool.bank.start" -> "tool", None for the final_answer tool and unknown namespaces."""
+    parts = path.split(".")
+    if parts[0] == "run":
+        parts = parts[1:]
+    if parts[:2] == ["tool", "custom"]:
+        return None
+    return STAGES.get(parts[0])
+
+
+def _name_of(stage: str, instance: Any) -> str:
+    if stage == "agent":
+        meta = getattr(instance, "meta", None)
+        return getattr(meta, "name", None) or type(instance).__name__
+    if stage == "llm":
+        return getattr(instance, "model_id", None) or type(instance).__name__
+    return getattr(instance, "name", None) or type(instance).__name__
+
+
+def _on_event(data: Any, event: EventMeta) -> None:
+    if event.id in _seen:
+        return
+    _seen[event.id] = None
+    if len(_seen) > _SEEN_SIZE:
+        _seen.popitem(last=False)
+
+    stage = _stage_of(event.path)
+    if stage is None or event.trace is None:
+        return
+    run_id = event.trace.run_id
+
+    if event.path.startswith("run."):
+        # The run emitter brackets the whole execution of an agent, model or tool
+        if event.name == "start":
+            instance = getattr(event.creator, "instance", event.creator)
+            name = _workflow_steps.get(event.trace.parent_run_id or "") if stage == "agent" else None
+            timer = _RunTimer(stage, name or _name_of(stage, instance), current_turn.get())
+            _running[run_id] = timer
+            if timer.turn is not None:
+                if stage == "llm":
+                    timer.turn.llm_calls += 1
+                elif stage == "tool":
+                    timer.turn.tool_calls += 1
+                    timer.turn.tools.append(timer.name)
+        elif event.name == "error" and run_id in _running:
+            _running[run_id].failed = True
+        elif event.name == "success" and stage == "llm":
+            _record_usage(run_id, getattr(data, "usage", None))
+        elif event.name == "finish" and run_id in _running:
+            _workflow_steps.pop(run_id, None)
+            _finish(_running.pop(run_id))
+    elif stage == "workflow" and event.name == "start":
+        _workflow_steps[run_id] = getattr(data, "step", None)
+    elif event.name == "retry":
+        timer = _running.get(run_id)
+        name = timer.name if timer else _name_of(stage, event.creator)
+        RETRIES.inc(stage=stage, name=name)
+        turn = current_turn.get()
+        if turn is not None:
+            turn.retries += 1
+
+
+def _forget_runs(turn: TurnStats) -> None:
+    """Drop the runs of an ended turn that never finished, their duration is unknown so it is not observed."""
+    for run_id, timer in list(_running.items()):
+        if timer.turn is turn:
+            del _running[run_id]
+            _workflow_steps.pop(run_id, None)
+
+
+def _record_usage(run_id: str, usage: Any) -> None:
+    if usage is None:
+        return
+    timer = _running.get(run_id)
+    model = timer.name if timer else "unknown"
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+    if timer and timer.turn is not None:
+        timer.turn.prompt_tokens += prompt_tokens
+        timer.turn.completion_tokens += completion_tokens
+
+
+def _finish(timer: _RunTimer) -> None:
+    duration = time.perf_counter() - timer.started_at
+    STAGE_DURATION.observe(duration, stage=timer.stage, name=timer.name)
+    if timer.failed:
+        ERRORS.inc(stage=timer.stage, name=timer.name)
+    if timer.turn is not None:
+        timer.turn.stages.append({
+            "stage": timer.stage,
+            "name": timer.name,
+            "ms": round(duration * 1000, 1),
+            "ok": not timer.failed,
+        })
+
+
+def install() -> None:
+    """Subscribe to every framework event once per process."""
+    global _installed
+    if not _installed:
+        Emitter.root().match("*.*", _on_event)
+        _installed = True
+
+
+def record_tool_call(name: str) -> None:
+    """Count a tool called directly rather than through its run, like the operations of BankOperationsTool."""
+    turn = current_turn.get()
+    if turn is not None:
+        turn.tool_calls += 1
+        turn.tools.append(name)
+
+
+@contextmanager
+def track_turn() -> Iterator[TurnStats]:
+    turn = TurnStats()
+    token = current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        current_turn.reset(token)
+        TURN_DURATION.observe(turn.duration)
+        _forget_runs(turn)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
@@ -1,8 +1,24 @@
+import asyncio
+import importlib
+import logging
+import os
+
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from chat_sockets import router as websocket_router
+import instrumentation
+import diagnostics
+from account_events import account_events
+
+logger = logging.getLogger("Startup")
+
+# Imported in the background once the worker serves requests, so the first chat session does not
+# wait for them. Set WARMUP_IMPORTS to an empty value to keep idle workers at their smallest RSS.
+WARMUP_IMPORTS = [name for name in os.getenv("WARMUP_IMPORTS", "beeai_framework.adapters.ollama.backend.chat").split(",") if name]
 
 app = FastAPI()
+instrumentation.install()
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,4 +28,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(websocket_router)
\ No newline at end of file
+app.include_router(websocket_router)
+app.include_router(diagnostics.router)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus scrape endpoint: stage durations, token counts, retries and errors
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+async def start_faq_recrawl():
+    # The crawler brings httpx, BeautifulSoup and the index builder, only loaded when it runs
+    if os.getenv("FAQ_RECRAWL_INTERVAL"):
+        from faq_crawler import start_background_recrawl
+
+        start_background_recrawl()
+
+
+async def warm_up(modules: list[str]) -> None:
+    for name in modules:
+        try:
+            await asyncio.to_thread(importlib.import_module, name)
+        except Exception as e:
+            logger.warning(f"Warm-up import of {name} failed: {e}")
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    app.state.warm_up = asyncio.create_task(warm_up(WARMUP_IMPORTS))
+
+
+@app.on_event("startup")
+async def start_account_events():
+    # One LISTEN connection fanning the bank's balance changes out to the chat sessions
+    account_events.start()
+
+
+@app.on_event("shutdown")
+async def stop_account_events():
+    await account_events.stop()
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    # Logs the stack of any tool or parser that blocks the loop longer than LOOP_LAG_THRESHOLD_MS
+    if diagnostics.LOOP_MONITOR:
+        diagnostics.monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await diagnostics.monitor.stop()
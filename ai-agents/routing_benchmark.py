@@ -0,0 +1,191 @@
+"""
+Intent-routing accuracy and cost of the chat pipeline over a labeled multilingual corpus.
+
+Each corpus line is {"id": ..., "lang": "en|fr|ar|aeb", "intent": "balance|history|transfer|loan|faq", "text": ...}.
+Every utterance goes through `answer_turn` in-process, exactly like a chat turn, and the intent the
+pipeline routed it to is read from the tools it called. The report has the confusion matrix, the
+accuracy per language and the LLM calls and latency per utterance.
+
+The transfer and loan utterances make the agent call the write tools. Unless `--allow-writes` is
+given, BankAPIClient answers those writes locally without calling the bank API, so a run does not
+move money or file loans for the benchmark user. The reads still go to the API.
+
+    python routing_benchmark.py --ollama http://localhost:11999 --label fake-react
+    python routing_benchmark.py --mode structured --label granite-structured
+    python routing_benchmark.py --routing speculative --label granite-speculative
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any
+
+from benchmark import load_corpus, percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_corpus.jsonl")
+INTENTS = ["balance", "history", "transfer", "loan", "faq"]
+# "multi": tools of several intents were called, "none": the turn was answered without any tool
+PREDICTIONS = INTENTS + ["multi", "none"]
+
+TOOL_INTENTS = {
+    "GetBalanceTool": "balance",
+    "GetTransactionHistoryTool": "history",
+    "MakeTransferTool": "transfer",
+    "RequestLoanTool": "loan",
+    "GetLoanStatusTool": "loan",
+    "FAQSearchTool": "faq",
+    "ScraperTool": "faq",
+}
+
+
+def dry_run_send_money(self, emitter: str, receiver: str, amount: float, date: datetime | None = None, idempotency_key: str | None = None) -> dict[str, Any]:
+    return {"message": f"Transaction successful, the ammount of {amount} has been sent to {receiver} (dry run, nothing was sent)"}
+
+
+def dry_run_request_loan(self, user: str, amount: float, date: datetime | None = None, idempotency_key: str | None = None) -> dict[str, Any]:
+    return {"message": "Loan request submitted (dry run, nothing was recorded)", "loan_id": 0}
+
+
+@contextmanager
+def dry_run_writes():
+    """Answer the write calls of BankAPIClient locally, the routing only depends on which tool was called."""
+    from bank_service import BankAPIClient
+
+    originals = BankAPIClient.send_money, BankAPIClient.request_loan
+    BankAPIClient.send_money, BankAPIClient.request_loan = dry_run_send_money, dry_run_request_loan
+    try:
+        yield
+    finally:
+        BankAPIClient.send_money, BankAPIClient.request_loan = originals
+
+
+def routed_intent(tools: list[str]) -> str:
+    # BankOperationsTool only dispatches, its operations are counted under their own tool names
+    intents = {TOOL_INTENTS[tool] for tool in tools if tool in TOOL_INTENTS}
+    if not intents:
+        return "none"
+    return intents.pop() if len(intents) == 1 else "multi"
+
+
+async def run_utterance(item: dict[str, Any], args: argparse.Namespace) -> dict[str, Any]:
+    from chat_sockets import answer_turn
+    from deadline import turn_deadline
+    from instrumentation import track_turn
+    from multi_test import create_chat_model, create_workflow
+    from speculative import SpeculativeAgents
+    from structured_agent import StructuredBankAgent
+
+    # A fresh pipeline per utterance, so no memory carries over from the previous one
+    workflow = create_workflow(args.user)
+    structured_agent = StructuredBankAgent(user=args.user, chat_model=create_chat_model()) if args.mode == "structured" else None
+    speculative = SpeculativeAgents(user=args.user, chat_model=create_chat_model()) if args.routing == "speculative" else None
+    record: dict[str, Any] = {"id": item["id"], "lang": item["lang"], "intent": item["intent"], "text": item["text"], "error": None}
+    with track_turn() as turn, turn_deadline():
+        try:
+            await asyncio.wait_for(answer_turn(args.user, item["text"], workflow, structured_agent, speculative), timeout=args.timeout)
+        except Exception as e:
+            record["error"] = str(e) or type(e).__name__
+    record.update({
+        "predicted": routed_intent(turn.tools),
+        "tools": turn.tools,
+        "llm_calls": turn.llm_calls,
+        "tool_calls": turn.tool_calls,
+        "prompt_tokens": turn.prompt_tokens,
+        "completion_tokens": turn.completion_tokens,
+        "latency_ms": round(turn.duration * 1000, 1),
+    })
+    return record
+
+
+def accuracy(records: list[dict[str, Any]]) -> float | None:
+    if not records:
+        return None
+    return round(sum(1 for r in records if r["predicted"] == r["intent"]) / len(records), 3)
+
+
+def summarize(records: list[dict[str, Any]]) -> dict[str, Any]:
+    confusion = {intent: {predicted: 0 for predicted in PREDICTIONS} for intent in INTENTS}
+    by_lang: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        confusion[record["intent"]][record["predicted"]] += 1
+        by_lang[record["lang"]].append(record)
+
+    latencies = [r["latency_ms"] for r in records]
+    llm_calls = [r["llm_calls"] for r in records]
+    return {
+        "utterances": len(records),
+        "errors": sum(1 for r in records if r["error"]),
+        "accuracy": accuracy(records),
+        "accuracy_by_lang": {lang: accuracy(items) for lang, items in sorted(by_lang.items())},
+        "accuracy_by_intent": {intent: accuracy([r for r in records if r["intent"] == intent]) for intent in INTENTS},
+        "llm_calls_per_utterance": round(statistics.mean(llm_calls), 2) if llm_calls else None,
+        "tokens_per_utterance": round(statistics.mean(r["prompt_tokens"] + r["completion_tokens"] for r in records), 1) if records else None,
+        "latency_ms": {f"p{p}": percentile(latencies, p) for p in (50, 95)},
+        "confusion": confusion,
+    }
+
+
+def format_confusion(confusion: dict[str, dict[str, int]]) -> str:
+    width = max(len(name) for name in PREDICTIONS) + 2
+    lines = ["expected \\ routed".ljust(18) + "".join(name.rjust(width) for name in PREDICTIONS)]
+    for intent, row in confusion.items():
+        lines.append(intent.ljust(18) + "".join(str(row[name]).rjust(width) for name in PREDICTIONS))
+    return "\n".join(lines)
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    import instrumentation
+
+    instrumentation.install()
+    corpus = [item for item in load_corpus(args.corpus) if not args.lang or item["lang"] in args.lang]
+    started = time.perf_counter()
+    records = []
+    with nullcontext() if args.allow_writes else dry_run_writes():
+        # One utterance at a time, latency is measured without contention
+        for item in corpus:
+            record = await run_utterance(item, args)
+            records.append(record)
+            marker = "ok " if record["predicted"] == record["intent"] else "ERR"
+            print(f"{marker} [{record['lang']}] {record['intent']:>8} -> {record['predicted']:<8} "
+                  f"{record['llm_calls']} LLM calls {record['latency_ms']:>8} ms  {record['text']}")
+    return {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {"mode": args.mode, "routing": args.routing, "ollama": os.getenv("OLLAMA_API_BASE"), "corpus": args.corpus, "user": args.user, "allow_writes": args.allow_writes},
+        "wall_time_s": round(time.perf_counter() - started, 2),
+        "summary": summarize(records),
+        "utterances": records,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the intent routing of the chat pipeline on a labeled corpus.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--mode", choices=["react", "structured"], default=os.getenv("BANK_AGENT_MODE", "react"))
+    parser.add_argument("--routing", choices=["sequential", "speculative"], default=os.getenv("AGENT_ROUTING", "sequential"))
+    parser.add_argument("--ollama", help="Ollama base URL, e.g. http://localhost:11999 for fake_ollama.py")
+    parser.add_argument("--lang", action="append", help="Only these languages (repeatable)")
+    parser.add_argument("--user", default="John Doe", help="Bank user the turns are run for")
+    parser.add_argument("--allow-writes", action="store_true", help="Really send the transfers and loan requests to the bank API")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for one utterance")
+    parser.add_argument("--label", default="routing", help="Name of the configuration being measured")
+    parser.add_argument("--output", help="JSON file for the results (default: results/<label>-<timestamp>.json)")
+    args = parser.parse_args()
+    if args.ollama:
+        os.environ["OLLAMA_API_BASE"] = args.ollama
+
+    results = asyncio.run(run_benchmark(args))
+    output = args.output or os.path.join("results", f"{args.label}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    summary = results["summary"]
+    print(format_confusion(summary["confusion"]))
+    print(json.dumps({k: v for k, v in summary.items() if k != "confusion"}, indent=2))
+    print(f"Results written to {output}")
@@ -0,0 +1,128 @@
+"""
+Speculative prefetch of the banking context of a `/chat` session.
+
+The balance, the first history page and the loans of the session's user are fetched concurrently
+from the bank API when the session opens and whenever a message arrives, while the LLM is still
+reading the message. The banking tools read them from here instead of waiting on the API.
+
+Entries are dropped after the session's own writes (transfer, loan request) and when the bank
+notifies a change through `account_events`. Without the notification listener nothing tells the
+session about changes made elsewhere, so entries are then only trusted for the turn they were
+fetched for.
+"""
+import asyncio
+import os
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Optional
+
+from account_events import account_events
+from bank_service import BankAPIClient
+from deadline import TURN_DEADLINE_SECONDS
+from instrumentation import PREFETCH
+from tool_output import HISTORY_FIELDS, HISTORY_PAGE_SIZE, is_error
+
+PREFETCH_KEYS = ("balance", "history", "loans")
+# How long entries are trusted while the bank's change notifications are received
+CONTEXT_TTL = float(os.getenv("SESSION_CONTEXT_TTL", "300"))
+PREFETCH_ENABLED = os.getenv("SESSION_PREFETCH", "1") == "1"
+
+current_session: ContextVar[Optional["SessionContext"]] = ContextVar("current_session", default=None)
+
+
+class _Entry:
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.fetched_at = time.monotonic()
+
+
+class SessionContext:
+    def __init__(self, user: str, client: Optional[BankAPIClient] = None) -> None:
+        self.user = user
+        self.client = client or BankAPIClient()
+        self.entries: dict[str, _Entry] = {}
+        _sessions.add(self)
+
+    def _fetcher(self, key: str) -> Callable[[], dict[str, Any]]:
+        if key == "balance":
+            return lambda: self.client.get_balance(self.user)
+        if key == "history":
+            # Same request as the first page of GetTransactionHistoryTool
+            return lambda: self.client.get_transactions_history(
+                self.user, limit=HISTORY_PAGE_SIZE, offset=0, fields=HISTORY_FIELDS, columnar=True
+            )
+        if key == "loans":
+            return lambda: self.client.get_loans(self.user)
+        raise KeyError(key)
+
+    @staticmethod
+    def _max_age() -> float:
+        return CONTEXT_TTL if account_events.connected else TURN_DEADLINE_SECONDS
+
+    async def _fetch(self, key: str) -> dict[str, Any]:
+        try:
+            return await asyncio.to_thread(self._fetcher(key))
+        except Exception as e:
+            return {"error": str(e)}
+
+    def prefetch(self, keys: Iterable[str] = PREFETCH_KEYS) -> None:
+        """Start fetching the `keys` that are not cached or in flight, without waiting for them."""
+        if not PREFETCH_ENABLED:
+            return
+        # Without change notifications every message refreshes the context
+        max_age = CONTEXT_TTL if account_events.connected else 0
+        now = time.monotonic()
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is not None and (not entry.task.done() or now - entry.fetched_at <= max_age):
+                continue
+            self.entries[key] = _Entry(asyncio.create_task(self._fetch(key)))
+
+    async def get(self, key: str, user: str) -> Optional[dict[str, Any]]:
+        """The prefetched `key` of `user`, None when the caller has to fetch it itself."""
+        entry = self.entries.get(key)
+        if user != self.user or entry is None or time.monotonic() - entry.fetched_at > self._max_age():
+            PREFETCH.inc(key=key, result="miss")
+            return None
+        result = await entry.task
+        if is_error(result) or self.entries.get(key) is not entry:
+            # Failed, or invalidated by a write while it was in flight
+            PREFETCH.inc(key=key, result="miss")
+            return None
+        PREFETCH.inc(key=key, result="hit")
+        return result
+
+    def invalidate(self, keys: Iterable[str] = PREFETCH_KEYS) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+
+
+# Open sessions, for the invalidations triggered outside of them
+_sessions: "weakref.WeakSet[SessionContext]" = weakref.WeakSet()
+
+
+def invalidate(user: str, keys: Iterable[str] = PREFETCH_KEYS) -> None:
+    """Drop the cached `keys` of `user` in every session of this process, after a write."""
+    keys = tuple(keys)
+    for session in list(_sessions):
+        if session.user == user:
+            session.invalidate(keys)
+
+
+async def prefetched(key: str, user: str) -> Optional[dict[str, Any]]:
+    """Prefetched `key` of `user` in the current session, None outside of a session or when not cached."""
+    session = current_session.get()
+    return await session.get(key, user) if session is not None else None
+
+
+def _on_account_change(user: Optional[str], event: dict[str, Any]) -> None:
+    keys = {"balance_changed": ("balance", "history"), "loan_decided": ("loans",)}.get(event.get("type"), PREFETCH_KEYS)
+    for session in list(_sessions):
+        if user is None or session.user == user:
+            session.invalidate(keys)
+            # The session will most likely look at what just changed
+            session.prefetch(keys)
+
+
+account_events.on_change(_on_account_change)
@@ -0,0 +1,228 @@
+"""
+Speculative routing of the messages that are both, or neither, clearly transactional or informational.
+
+The sequential workflow runs BankAgent, then BankInfoAgent, even when only one of them has
+anything to say. For a message like "can I get a loan and what's the interest rate" both agents
+start at once instead, each on its own fork of the session memory. The first agent that answers
+confidently (it called its own tools and they returned something) settles the turn: the other
+agent is cancelled if it has not called any of its tools yet, otherwise its answer is awaited and
+merged, BankAgent's first. An agent with a tool call in flight is never cancelled, a transfer is
+not cut half-way.
+
+Enabled with AGENT_ROUTING=speculative, see `chat_sockets.answer_turn`.
+"""
+import asyncio
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from beeai_framework.backend.chat import ChatModel
+from beeai_framework.backend.message import AssistantMessage, UserMessage
+from beeai_framework.emitter.emitter import Emitter, EventMeta
+from beeai_framework.logger import Logger
+from beeai_framework.memory import SlidingMemory, SlidingMemoryConfig, UnconstrainedMemory
+from beeai_framework.tools.tool import Tool
+
+from deadline import DeadlineToolCallingAgent
+from langid import Language, detect_language, response_instruction
+from bank_tools import NO_FAQ_MATCH
+from multi_test import BANK_AGENT_INSTRUCTIONS, BANK_AGENT_ROLE, INFO_AGENT_INSTRUCTIONS, INFO_AGENT_ROLE, bank_agent_tools, create_agent, info_agent_tools
+
+logger = Logger(__name__)
+
+# "sequential" always runs the AgentWorkflow, "speculative" runs both agents concurrently on ambiguous messages
+AGENT_ROUTING = os.getenv("AGENT_ROUTING", "sequential")
+# Messages of the session the agents see, user messages and answers
+HISTORY_SIZE = int(os.getenv("SPECULATIVE_HISTORY_SIZE", "10"))
+
+# Latin script terms match whole words, Arabic script terms anywhere in the message (attached articles and pronouns)
+TRANSACTIONAL_TERMS = {
+    "latin": [
+        "balance", "transfer", "send", "history", "transactions?", "loans?", "borrow", "how much money",
+        "solde", "virement", "virer", "envoyer", "historique", "pr[eê]t", "cr[eé]dit", "emprunt",
+        "flous", "9adeh", "ab3ath", "b3ath", "kridi", "sold",
+    ],
+    "arabic": ["رصيد", "تحويل", "حول", "بعث", "سجل", "معاملات", "قرض", "سلف", "فلوس", "قداه", "كريدي"],
+}
+INFORMATIONAL_TERMS = {
+    "latin": [
+        "rates?", "interest", "fees?", "conditions?", "requirements?", "documents?", "polic(y|ies)", "procedures?",
+        "cards?", "bonds?", "obligations?", "agency", "branch(es)?", "eligib(le|ility)", "open an account",
+        "taux", "int[eé]r[eê]ts?", "frais", "pi[eè]ces?", "politique", "proc[eé]dures?", "cartes?", "agences?",
+        "[eé]ligible", "ouvrir un compte", "kifech", "kifeh",
+    ],
+    "arabic": ["فائدة", "فايدة", "نسبة", "رسوم", "شروط", "وثائق", "أوراق", "ورق", "سياسة", "إجراءات", "بطاقة", "فرع", "وكالة", "كيفاش"],
+}
+
+
+def _pattern(terms: dict[str, list[str]]) -> re.Pattern:
+    latin = r"\b(" + "|".join(terms["latin"]) + r")\b"
+    arabic = "|".join(terms["arabic"])
+    return re.compile(f"{latin}|{arabic}", re.IGNORECASE)
+
+
+_TRANSACTIONAL = _pattern(TRANSACTIONAL_TERMS)
+_INFORMATIONAL = _pattern(INFORMATIONAL_TERMS)
+
+
+def classify(text: str) -> set[str]:
+    """Kinds of request the message looks like: "transactional", "informational", both or none."""
+    kinds = set()
+    if _TRANSACTIONAL.search(text):
+        kinds.add("transactional")
+    if _INFORMATIONAL.search(text):
+        kinds.add("informational")
+    return kinds
+
+
+def is_ambiguous(text: str) -> bool:
+    return len(classify(text)) != 1
+
+
+def _useful(result: str) -> bool:
+    """A tool result the agent can build a confident answer on."""
+    result = result.strip()
+    return bool(result) and not result.startswith(("error:", '{"error"')) and result != NO_FAQ_MATCH
+
+
+class _Candidate:
+    """One of the agents run for a turn, with what its own tools did so far."""
+
+    def __init__(self, name: str, agent: DeadlineToolCallingAgent, tools: list[Tool]) -> None:
+        self.name = name
+        self.agent = agent
+        self.tools = {tool.name for tool in tools}
+        # Run ids of the tool calls in flight
+        self.running: set[str] = set()
+        self.called = False
+        self.found = False
+        self.answer: Optional[str] = None
+
+    @property
+    def confident(self) -> bool:
+        return self.answer is not None and self.found
+
+    @property
+    def cancellable(self) -> bool:
+        return not self.called and not self.running
+
+
+# Candidate the current task runs for, tool events are attributed to it
+_candidate: ContextVar[Optional[_Candidate]] = ContextVar("speculative_candidate", default=None)
+_installed = False
+
+
+def _on_tool_event(data: Any, event: EventMeta) -> None:
+    candidate = _candidate.get()
+    creator = getattr(event.creator, "name", None)
+    if candidate is None or event.trace is None or creator not in candidate.tools:
+        return
+    # Nested runs pipe their events to every ancestor emitter, the sets make repeated events harmless
+    if event.name == "start":
+        candidate.called = True
+        candidate.running.add(event.trace.run_id)
+    elif event.name == "success":
+        output = getattr(data, "output", None)
+        if output is not None and _useful(output.get_text_content()):
+            candidate.found = True
+    elif event.name == "finish":
+        candidate.running.discard(event.trace.run_id)
+
+
+def install() -> None:
+    global _installed
+    if not _installed:
+        Emitter.root().match(re.compile(r"^tool\."), _on_tool_event)
+        _installed = True
+
+
+class SpeculativeAgents:
+    def __init__(self, user: str, chat_model: ChatModel, history_size: int = HISTORY_SIZE) -> None:
+        install()
+        self.user = user
+        self.chat_model = chat_model
+        self.memory = SlidingMemory(SlidingMemoryConfig(size=history_size))
+
+    @staticmethod
+    def should_handle(user_input: str) -> bool:
+        return is_ambiguous(user_input)
+
+    async def _fork(self, name: str, role: str, instructions: str, tools: list[Tool]) -> _Candidate:
+        memory = UnconstrainedMemory()
+        await memory.add_many(self.memory.messages)
+        # Same agents as the workflow ones, with the iteration budget sized on the time left when they start
+        agent = create_agent(role, instructions, tools, self.chat_model)
+        agent.memory = memory
+        return _Candidate(name, agent, tools)
+
+    def _prompt(self, user_input: str, language: Language) -> str:
+        local_time = time.localtime()
+        return f"""
+            You are assisting the user: {self.user}. Current date: {time.strftime("%Y-%m-%d", local_time)}, time: {time.strftime("%H:%M", local_time)}.
+            You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
+            The user message is: [USER MESSAGE START]{user_input}[USER MESSAGE END].
+            Only answer the part of the message you handle, another agent answers the rest.
+
+            - {response_instruction(language)}
+            """
+
+    async def _run(self, candidate: _Candidate, prompt: str) -> _Candidate:
+        _candidate.set(candidate)
+        output = await candidate.agent.run(prompt)
+        candidate.answer = output.result.text
+        return candidate
+
+    async def run(
+        self,
+        user_input: str,
+        language: Optional[Language] = None,
+        on_partial: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        language = language or detect_language(user_input)
+        prompt = self._prompt(user_input, language)
+        candidates = [
+            await self._fork("BankAgent", BANK_AGENT_ROLE, BANK_AGENT_INSTRUCTIONS, bank_agent_tools()),
+            await self._fork("BankInfoAgent", INFO_AGENT_ROLE, INFO_AGENT_INSTRUCTIONS, info_agent_tools()),
+        ]
+        tasks = {asyncio.create_task(self._run(candidate, prompt)): candidate for candidate in candidates}
+        pending = set(tasks)
+        errors: list[BaseException] = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # An agent cancelled from the inside (its LLM request was) has no exception to report
+                    if task.cancelled():
+                        logger.warning(f"{tasks[task].name} was cancelled")
+                        continue
+                    if task.exception() is not None:
+                        logger.warning(f"{tasks[task].name} failed: {task.exception()}")
+                        errors.append(task.exception())
+                settled = [candidate for candidate in candidates if candidate.confident]
+                if not settled:
+                    continue
+                if on_partial:
+                    on_partial(self._merge(settled))
+                for task in list(pending):
+                    if tasks[task].cancellable:
+                        logger.info(f"{tasks[task].name} cancelled, {settled[0].name} answered first")
+                        task.cancel()
+                        pending.discard(task)
+        finally:
+            # The turn deadline cancels this run, the agents must not outlive it
+            for task in pending:
+                task.cancel()
+
+        answered = [candidate for candidate in candidates if candidate.answer is not None]
+        if not answered and errors:
+            raise errors[0]
+        # Without any confident answer, BankInfoAgent's is the one that politely says nothing was found
+        answer = self._merge([candidate for candidate in answered if candidate.confident] or answered[-1:])
+        await self.memory.add_many([UserMessage(user_input), AssistantMessage(answer)])
+        return answer
+
+    @staticmethod
+    def _merge(candidates: list[_Candidate]) -> str:
+        return "\n\n".join(candidate.answer for candidate in candidates)
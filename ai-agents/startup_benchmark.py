@@ -0,0 +1,145 @@
+"""
+Cold start cost of an ai-agents worker: import time and baseline memory of `main`.
+
+Every run starts a fresh interpreter that imports the app module, the way a new uvicorn worker
+does, and reports the import wall time, the resident memory right after it and which of the heavy
+optional dependencies got loaded. `--warm` also measures the worker once the background warm-up
+imports are done (see WARMUP_IMPORTS in main.py).
+
+    python startup_benchmark.py --runs 5 --label lazy-tools
+    python startup_benchmark.py --warm --label lazy-tools-warm
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any
+
+from benchmark import percentile
+
+HEAVY_MODULES = ["litellm", "newspaper", "lxml", "bs4", "numpy", "httpx", "nltk", "PIL"]
+
+# Runs in the child interpreter, prints one JSON line
+PROBE = """
+import json, resource, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+started = time.perf_counter()
+import importlib
+importlib.import_module({module!r})
+result = {{
+    "import_s": time.perf_counter() - started,
+    "rss_mb": rss_mb(),
+    "modules": len(sys.modules),
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+    "warm_s": None,
+    "warm_rss_mb": None,
+}}
+if {warm!r}:
+    import main
+    for name in main.WARMUP_IMPORTS:
+        importlib.import_module(name)
+    result["warm_s"] = time.perf_counter() - started
+    result["warm_rss_mb"] = rss_mb()
+print(json.dumps(result))
+"""
+
+
+def run_probe(module: str, warm: bool, env: dict[str, str]) -> dict[str, Any]:
+    code = PROBE.format(module=module, warm=warm, heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, env: dict[str, str], top: int) -> list[dict[str, Any]]:
+    """Top-level packages by cumulative import time, from `python -X importtime`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    packages: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.rstrip()
+        # Direct imports of the app's modules and their first-level dependencies
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth > 1 or not cumulative.strip().isdigit():
+            continue
+        packages[name.strip()] = max(packages.get(name.strip(), 0), int(cumulative))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    env = dict(os.environ)
+    runs = [run_probe(args.module, args.warm, env) for _ in range(args.runs)]
+    for run in runs:
+        warm = f", warmed up after {run['warm_s']:.2f}s with {run['warm_rss_mb']:.1f} MB" if run["warm_s"] is not None else ""
+        print(f"import {run['import_s']:.2f}s, RSS {run['rss_mb']:.1f} MB, heavy modules: {', '.join(run['heavy']) or 'none'}{warm}")
+
+    import_times = [run["import_s"] * 1000 for run in runs]
+    summary = {
+        "runs": len(runs),
+        "import_ms": {"mean": round(statistics.mean(import_times), 1), "p50": percentile(import_times, 50), "max": round(max(import_times), 1)},
+        "rss_mb": round(statistics.mean(run["rss_mb"] for run in runs), 1),
+        "modules": runs[-1]["modules"],
+        "heavy_modules": runs[-1]["heavy"],
+    }
+    if args.warm:
+        summary["warm_ms"] = round(statistics.mean(run["warm_s"] for run in runs) * 1000, 1)
+        summary["warm_rss_mb"] = round(statistics.mean(run["warm_rss_mb"] for run in runs), 1)
+    return {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {"module": args.module, "warm": args.warm, "python": sys.version.split()[0]},
+        "summary": summary,
+        "slowest_imports": slowest_imports(args.module, env, args.top),
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the import time and baseline memory of a fresh worker.")
+    parser.add_argument("--module", default="main", help="Module a worker imports at startup")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--warm", action="store_true", help="Also run the warm-up imports and measure after them")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to report")
+    parser.add_argument("--label", default="startup", help="Name of the configuration being measured")
+    parser.add_argument("--output", help="JSON file for the results (default: results/<label>-<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    output = args.output or os.path.join("results", f"{args.label}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(results["summary"], indent=2))
+    for item in results["slowest_imports"]:
+        print(f"{item['ms']:>10.1f} ms  {item['module']}")
+    print(f"Results written to {output}")
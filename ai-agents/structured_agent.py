@@ -0,0 +1,139 @@
+import json
+import uuid
+from typing import Any, Callable, Literal, Optional
+
+from beeai_framework.backend.chat import ChatModel
+from beeai_framework.backend.message import SystemMessage, UserMessage
+from beeai_framework.logger import Logger
+from pydantic import BaseModel
+
+from bank_tools import BankOperationsTool, BankToolInput
+from langid import Language, detect_language
+from tool_output import iter_transactions
+
+logger = Logger(__name__)
+
+
+# ---- STRUCTURED OUTPUT SCHEMAS ----
+class BankAction(BaseModel):
+    """
+        One banking action requested by the user.
+
+        - "get-balance": Get current account balance
+        - "get-transaction-history": View the list of past transactions
+        - "make-transfer": Send money to another user (requires `amount` and `receiver`)
+        - "request-loan": Ask for a loan (requires `amount`)
+        - "get-loan-status": Check whether the user's loan requests were accepted
+    """
+    action: Literal["request-loan", "make-transfer", "get-balance", "get-transaction-history", "get-loan-status"]
+    amount: Optional[float] = None
+    receiver: Optional[str] = None
+
+
+class BankRequestPlan(BaseModel):
+    """All banking actions found in the user message, empty when the message is not transactional."""
+    operations: list[BankAction]
+
+
+PLANNER_INSTRUCTIONS = """
+You extract banking operations from a user message.
+You understand English , French, Arabic, and Tunisian dialect (mix between arabic and french sometimes).
+Return every operation the user asks for: balance check, transaction history, money transfer, loan request or loan status.
+If the message is a question about banking products, policies or procedures, return an empty list of operations.
+"""
+
+
+def render_result(action: BankToolInput, result: Any) -> str:
+    """Turn a raw tool result into a short English sentence without calling the LLM."""
+    if not isinstance(result, dict):
+        return f"{action.action}: {json.dumps(result)}"
+    if "error" in result or "detail" in result:
+        return f"The {action.action} operation failed: {result.get('error') or result.get('detail')}"
+
+    if action.action == "get-balance":
+        return f"Your current balance is {result.get('balance')}."
+    if action.action == "get-transaction-history":
+        totals = result.get("totals") or {}
+        lines = [
+            f"You have {result.get('count', 0)} transactions: {totals.get('sent', 0.0):.2f} sent and "
+            f"{totals.get('received', 0.0):.2f} received. Latest ones:"
+        ]
+        for transaction in iter_transactions(result):
+            lines.append(
+                f"- {transaction.get('date')}: {transaction.get('emitter')} -> {transaction.get('receiver')}, {transaction.get('amount')}"
+            )
+        return "\n".join(lines)
+    if action.action == "request-loan":
+        return f"Your loan request of {action.amount} has been submitted (loan id {result.get('loan_id')}), it will be decided within minutes."
+    if action.action == "get-loan-status":
+        loans = result.get("loans", [])
+        if not loans:
+            return "You have no loan requests."
+        return "\n".join(f"- Loan {loan['loan_id']} of {loan['amount']}: {loan['status']}" for loan in loans)
+    return result.get("message", json.dumps(result))
+
+
+class StructuredBankAgent:
+    """
+    Single-shot alternative to the ReAct BankAgent.
+
+    The model is asked once for a `BankRequestPlan` (JSON schema constrained output), the
+    operations are executed directly through `BankOperationsTool` and the answer is templated.
+    At most one extra LLM call is made to phrase the templated answer in the user's language,
+    none when the user writes in English.
+    """
+
+    def __init__(self, user: str, chat_model: ChatModel, rephrase: bool = True) -> None:
+        self.user = user
+        self.chat_model = chat_model
+        self.rephrase = rephrase
+        self.operations_tool = BankOperationsTool()
+
+    async def plan(self, user_input: str) -> BankRequestPlan:
+        output = await self.chat_model.create_structure(
+            schema=BankRequestPlan,
+            messages=[SystemMessage(PLANNER_INSTRUCTIONS), UserMessage(user_input)],
+        )
+        return BankRequestPlan.model_validate(output.object)
+
+    async def run(
+        self,
+        user_input: str,
+        language: Optional[Language] = None,
+        on_partial: Optional[Callable[[str], None]] = None,
+        turn_id: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Return the answer for a transactional message, or None when the message is not transactional.
+
+        `on_partial` receives the templated English answer before it is rephrased, to answer with
+        it if the turn runs out of time during the rephrasing. The writes of the turn get idempotency
+        keys scoped to `turn_id` (a new one per call by default): running the turn again with the
+        same id does not send the transfers or loan requests twice.
+        """
+        turn_id = turn_id or uuid.uuid4().hex
+        plan = await self.plan(user_input)
+        logger.info(f"Structured plan: {plan}")
+        if not plan.operations:
+            return None
+
+        operations = [BankToolInput(user=self.user, **operation.model_dump()) for operation in plan.operations]
+        results = await self.operations_tool.execute(operations, scope=turn_id)
+        answer = "\n".join(render_result(operation, result) for operation, result in zip(operations, results))
+        if on_partial is not None:
+            on_partial(answer)
+
+        language = language or detect_language(user_input)
+        # The templates are already in English
+        if not self.rephrase or language.code == "en":
+            return answer
+        response = await self.chat_model.create(
+            messages=[
+                SystemMessage(
+                    f"Rewrite the banking assistant answer for the user in {language.name}. "
+                    "Keep every number and name unchanged and do not add information."
+                ),
+                UserMessage(f"User message: {user_input}\nAnswer: {answer}"),
+            ]
+        )
+        return response.get_text_content()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# The ai-agents modules are flat, imported from the service directory, and the shared modules are on
+# the path like in the images
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(1, os.path.join(os.path.dirname(SERVICE_DIR), "shared"))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+from bank_service import BankAPIClient
+from bank_tools import BankOperationsTool, BankToolInput
+
+READ_SECONDS = 0.3
+
+
+def slow_read(result):
+    def read(self, user, **kwargs):
+        time.sleep(READ_SECONDS)
+        return result
+
+    return read
+
+
+def test_reads_of_one_call_run_concurrently(monkeypatch):
+    monkeypatch.setattr(BankAPIClient, "get_balance", slow_read({"balance": 10.0}))
+    monkeypatch.setattr(BankAPIClient, "get_transactions_history", slow_read({"count": 0, "transactions": []}))
+    monkeypatch.setattr(BankAPIClient, "get_loans", slow_read({"loans": []}))
+    operations = [
+        BankToolInput(action=action, user="John Doe")
+        for action in ("get-balance", "get-transaction-history", "get-loan-status")
+    ]
+
+    started = time.perf_counter()
+    results = asyncio.run(BankOperationsTool().execute(operations))
+    elapsed = time.perf_counter() - started
+
+    assert results == [{"balance": 10.0}, {"count": 0, "transactions": []}, {"loans": []}]
+    assert elapsed < READ_SECONDS * 2
@@ -0,0 +1,16 @@
+from benchmark import DEFAULT_CORPUS, WRITES_CORPUS, load_corpus
+
+WRITE_WORDS = ("send", "envoyer", "نبعث", "request a", "transfer ")
+
+
+def test_default_corpus_only_reads():
+    turns = [turn.lower() for conversation in load_corpus(DEFAULT_CORPUS) for turn in conversation["turns"]]
+
+    assert not [turn for turn in turns if any(word in turn for word in WRITE_WORDS)]
+
+
+def test_write_conversations_are_opt_in():
+    default_ids = {conversation["id"] for conversation in load_corpus(DEFAULT_CORPUS)}
+    write_ids = {conversation["id"] for conversation in load_corpus(WRITES_CORPUS)}
+
+    assert write_ids and not default_ids & write_ids
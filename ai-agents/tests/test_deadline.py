@@ -0,0 +1,36 @@
+import asyncio
+
+from beeai_framework.agents.tool_calling.agent import ToolCallingAgent
+from beeai_framework.agents.types import AgentExecutionConfig
+from beeai_framework.backend.chat import ChatModel
+
+from deadline import MAX_ITERATIONS, SECONDS_PER_ITERATION, DeadlineToolCallingAgent, execution_config, turn_deadline
+
+
+def test_execution_config_outside_of_a_turn():
+    config = execution_config(max_retries_per_step=3)
+
+    assert type(config) is AgentExecutionConfig
+    assert (config.max_iterations, config.max_retries_per_step) == (MAX_ITERATIONS, 3)
+
+
+def test_execution_config_is_capped_by_the_time_left():
+    with turn_deadline(SECONDS_PER_ITERATION * 2.5):
+        assert execution_config().max_iterations == 2
+    with turn_deadline(0):
+        assert execution_config().max_iterations == 1
+
+
+def test_each_run_gets_its_own_plain_config(monkeypatch):
+    configs = []
+    monkeypatch.setattr(ToolCallingAgent, "run", lambda self, prompt=None, *, execution=None, **kwargs: configs.append(execution))
+    agent = DeadlineToolCallingAgent(llm=ChatModel.from_name("ollama:fake"), execution={"total_max_retries": 10})
+
+    with turn_deadline(SECONDS_PER_ITERATION * 3.5):
+        agent.run("first")
+    with turn_deadline(SECONDS_PER_ITERATION * 1.5):
+        asyncio.run(agent.clone()).run("second")
+
+    assert all(type(config) is AgentExecutionConfig for config in configs)
+    assert [config.max_iterations for config in configs] == [3, 1]
+    assert [config.total_max_retries for config in configs] == [10, 10]
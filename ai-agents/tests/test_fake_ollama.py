@@ -0,0 +1,49 @@
+import json
+
+from fake_ollama import FakeModelConfig, respond
+
+TOOLS = [{"type": "function", "function": {"name": name, "parameters": {"properties": {"user": {}}}}} for name in ("GetBalanceTool", "final_answer")]
+PROMPT = "You are assisting the user: John Doe. [USER MESSAGE START]what is my balance[USER MESSAGE END]"
+
+
+def config() -> FakeModelConfig:
+    return FakeModelConfig(ttft_ms=0, tokens_per_second=0)
+
+
+def final_answer_call(response: str, call_id: str) -> list[dict]:
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{
+            "id": call_id, "type": "function", "function": {"name": "final_answer", "arguments": json.dumps({"response": response})},
+        }]},
+        {"role": "tool", "tool_call_id": call_id, "name": "final_answer", "content": "Message has been sent"},
+    ]
+
+
+def test_first_agent_calls_the_bank_tool_then_answers_with_its_result():
+    messages = [{"role": "system", "content": "BankAgent"}, {"role": "user", "content": PROMPT}]
+    call = respond(config(), messages, None, TOOLS)["tool_calls"][0]
+    assert call["function"]["name"] == "GetBalanceTool"
+
+    messages += [
+        {"role": "assistant", "content": None, "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": call["id"], "name": "GetBalanceTool", "content": "balance=793.00"},
+    ]
+    assert respond(config(), messages, None, TOOLS) == {"content": "Here is what I found: balance=793.00"}
+
+
+def test_second_agent_returns_the_first_agent_answer_not_the_final_answer_acknowledgement():
+    # What the workflow's second agent receives: the first agent's final_answer call, then its own task
+    messages = [
+        {"role": "system", "content": "BankInfoAgent"},
+        {"role": "user", "content": PROMPT},
+        *final_answer_call("Here is what I found: balance=793.00", "call_1"),
+        {"role": "user", "content": "Return that answer unchanged. [USER MESSAGE START]what is my balance[USER MESSAGE END]"},
+    ]
+
+    assert respond(config(), messages, None, [TOOLS[1]]) == {"content": "Here is what I found: balance=793.00"}
+
+
+def test_final_answer_acknowledgement_is_never_used_as_an_answer():
+    messages = [{"role": "user", "content": PROMPT}, *final_answer_call("", "call_2")]
+
+    assert respond(config(), messages, None, [TOOLS[1]]) == {"content": "I could not find an answer to your request."}
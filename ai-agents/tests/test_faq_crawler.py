@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import faq_index
+from conftest import read_fixture
+from faq_crawler import FAQCrawler
+from faq_index import FAQIndex, FAQRetriever
+from faq_store import FAQStore
+
+
+class FixtureServer:
+    """Local HTTP server serving FAQ pages, with ETag revalidation that can be turned off."""
+
+    def __init__(self) -> None:
+        self.pages: dict[str, str] = {}
+        self.etags = True
+        self.requests: list[tuple[str, int]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = server.pages[self.path].encode("utf-8")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if server.etags and self.headers.get("If-None-Match") == etag:
+                    server.requests.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                server.requests.append((self.path, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if server.etags:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def statuses(self) -> list[int]:
+        statuses = [status for _, status in self.requests]
+        self.requests.clear()
+        return statuses
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer()
+    yield server
+    server.httpd.shutdown()
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Replace the Ollama embeddings with deterministic vectors, records every embedded text."""
+    texts: list[str] = []
+
+    def embed(batch: list[str], prefix: str) -> np.ndarray:
+        texts.extend(batch)
+        vectors = np.asarray([[len(text), sum(map(ord, text)) % 97, 1.0] for text in batch], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    monkeypatch.setattr(faq_index, "embed", embed)
+    return texts
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    # The fixture server is local, a proxy configured in the environment must not be used
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+    store = FAQStore(str(tmp_path / "faq.sqlite3"))
+    yield FAQCrawler(store, str(tmp_path / "faq_index"), parser_processes=1)
+    store.close()
+
+
+def crawl(crawler: FAQCrawler, *urls: str) -> bool:
+    return asyncio.run(crawler.crawl(list(urls)))
+
+
+def test_first_crawl_builds_the_index(server, crawler, embedded):
+    server.pages["/faq"] = read_fixture("biat_faq.html")
+
+    assert crawl(crawler, server.url("/faq")) is True
+
+    assert server.statuses() == [200]
+    assert len(crawler.store.chunks_for_url(server.url("/faq"))) == 3
+    assert len(embedded) == 3
+    index = FAQIndex(crawler.index_dir)
+    assert index.meta["documents"] == 3 and index.embeddings is not None
+
+
+def test_not_modified_source_is_revalidated_with_its_etag(server, crawler, embedded):
+    url = server.url("/faq")
+    server.pages["/faq"] = read_fixture("biat_faq.html")
+    crawl(crawler, url)
+    server.statuses()
+    fetched_at = crawler.store.get_source(url).fetched_at
+
+    assert crawl(crawler, url) is False
+
+    assert server.statuses() == [304]
+    assert crawler.store.get_source(url).fetched_at > fetched_at
+    assert len(embedded) == 3
+
+
+def test_same_content_without_validators_is_not_parsed_again(server, crawler, embedded, monkeypatch):
+    url = server.url("/faq")
+    server.etags = False
+    server.pages["/faq"] = read_fixture("biat_faq.html")
+    crawl(crawler, url)
+    server.statuses()
+
+    def replace_source(*args, **kwargs):
+        raise AssertionError("an unchanged page must not be written again")
+
+    monkeypatch.setattr(crawler.store, "replace_source", replace_source)
+
+    assert crawl(crawler, url) is False
+    assert server.statuses() == [200]
+    assert len(embedded) == 3
+
+
+def test_changed_page_only_re_embeds_the_changed_chunks(server, crawler, embedded):
+    url = server.url("/faq")
+    page = read_fixture("biat_faq.html")
+    server.pages["/faq"] = page
+    crawl(crawler, url)
+    kept_ids = [chunk.id for chunk in crawler.store.chunks_for_url(url)[:2]]
+    embedded.clear()
+
+    server.pages["/faq"] = page.replace("5 dinars par trimestre", "6 dinars par trimestre")
+    assert crawl(crawler, url) is True
+
+    assert server.statuses()[-1] == 200
+    assert embedded == ["Quels sont les frais de tenue de compte ?\nLes frais de tenue de compte sont de 6 dinars par trimestre."]
+    chunks = crawler.store.chunks_for_url(url)
+    assert chunks[0].id == kept_ids[0]
+    assert "6 dinars" in " ".join(chunk.answer for chunk in chunks)
+    assert FAQRetriever(crawler.store, crawler.index_dir).search("frais tenue de compte")[0].answer.endswith("6 dinars par trimestre.")
+
+
+def test_rebuild_switches_the_index_atomically(server, crawler, embedded):
+    url = server.url("/faq")
+    server.pages["/faq"] = read_fixture("biat_faq.html")
+    crawl(crawler, url)
+    first = FAQIndex(crawler.index_dir)
+
+    server.pages["/faq"] = read_fixture("biat_faq.html").replace("24h/24", "jour et nuit")
+    crawl(crawler, url)
+
+    assert os.path.islink(crawler.index_dir)
+    assert first.is_stale()
+    # The index loaded before the rebuild still answers from its own version
+    assert first.meta["documents"] == FAQIndex(crawler.index_dir).meta["documents"] == 3
+    versions = [entry for entry in os.listdir(os.path.dirname(crawler.index_dir)) if entry.startswith("faq_index.")]
+    assert len(versions) == 2
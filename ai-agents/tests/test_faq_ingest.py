@@ -0,0 +1,73 @@
+import pytest
+
+from conftest import read_fixture
+from faq_ingest import ingest, split_faq
+from faq_store import FAQStore
+
+BIAT_URL = "https://www.biat.com.tn/faq"
+ZITOUNA_URL = "https://www.banquezitouna.com/faq"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FAQStore(str(tmp_path / "faq.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_split_faq_extracts_questions_and_answers():
+    chunks = split_faq(read_fixture("biat_faq.html"), BIAT_URL)
+
+    assert [chunk.question for chunk in chunks] == [
+        "Comment ouvrir un compte à la BIAT ?",
+        "Quels sont les frais de tenue de compte ?",
+        "Comment faire opposition sur ma carte ?",
+    ]
+    # Answers spanning several paragraphs are joined, whitespace is normalized
+    assert chunks[0].answer == (
+        "Présentez-vous dans l'agence de votre choix avec votre pièce d'identité et un justificatif de domicile. "
+        "Le compte est ouvert le jour même."
+    )
+    assert {(chunk.bank, chunk.lang, chunk.url) for chunk in chunks} == {("biat", "fr", BIAT_URL)}
+
+
+def test_split_faq_ignores_scripts_navigation_and_forms():
+    chunks = split_faq(read_fixture("biat_faq.html"), BIAT_URL)
+    text = " ".join(f"{chunk.question} {chunk.answer}" for chunk in chunks)
+
+    assert "dataLayer" not in text
+    assert "Une question ?" not in text
+    assert "Vous n'avez pas trouvé votre réponse ?" not in text
+    # The last answer stops before the footer
+    assert chunks[-1].answer == "Appelez le centre monétique au 71 000 000, 24h/24 et 7j/7."
+
+
+def test_split_faq_arabic_page():
+    chunks = split_faq(read_fixture("zitouna_faq_ar.html"), ZITOUNA_URL)
+
+    assert len(chunks) == 2
+    assert chunks[1].question == "كيف يمكنني فتح حساب؟"
+    assert {(chunk.bank, chunk.lang) for chunk in chunks} == {("zitouna", "ar")}
+
+
+def test_ingest_stores_the_chunks_of_every_source(store):
+    pages = {BIAT_URL: read_fixture("biat_faq.html"), ZITOUNA_URL: read_fixture("zitouna_faq_ar.html")}
+
+    counts = ingest(store, list(pages), fetch=pages.__getitem__)
+
+    assert counts == {BIAT_URL: 3, ZITOUNA_URL: 2}
+    assert len(store.chunks_for_url(BIAT_URL)) == 3
+    assert store.get_source(ZITOUNA_URL).bank == "zitouna"
+    assert store.get_source(BIAT_URL).content_hash
+
+
+def test_ingest_keeps_the_previous_chunks_of_a_failing_source(store):
+    ingest(store, [BIAT_URL], fetch=lambda url: read_fixture("biat_faq.html"))
+
+    def unreachable(url: str) -> str:
+        raise ConnectionError("bank site is down")
+
+    counts = ingest(store, [BIAT_URL], fetch=unreachable)
+
+    assert counts == {}
+    assert len(store.chunks_for_url(BIAT_URL)) == 3
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from faq_store import FAQChunk, FAQStore
+
+URL = "https://www.wifakbank.com/faq"
+
+
+def chunk(question: str, answer: str, bank: str = "wifakbank", url: str = URL) -> FAQChunk:
+    return FAQChunk(url=url, bank=bank, lang="fr", question=question, answer=answer)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FAQStore(str(tmp_path / "faq.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_replace_source_adds_the_chunks(store):
+    added, removed = store.replace_source(URL, "wifakbank", [chunk("Quel est le taux ?", "8%"), chunk("Frais ?", "10 dinars")], "h1")
+
+    assert (added, removed) == (2, 0)
+    assert [c.question for c in store.chunks_for_url(URL)] == ["Quel est le taux ?", "Frais ?"]
+    assert store.get_source(URL).content_hash == "h1"
+
+
+def test_replace_source_keeps_unchanged_chunks_and_their_ids(store):
+    store.replace_source(URL, "wifakbank", [chunk("Quel est le taux ?", "8%"), chunk("Frais ?", "10 dinars")], "h1")
+    kept_id = store.chunks_for_url(URL)[0].id
+
+    added, removed = store.replace_source(URL, "wifakbank", [chunk("Quel est le taux ?", "8%"), chunk("Frais ?", "12 dinars")], "h2")
+
+    assert (added, removed) == (1, 1)
+    chunks = store.chunks_for_url(URL)
+    assert chunks[0].id == kept_id
+    assert [c.answer for c in chunks] == ["8%", "12 dinars"]
+    assert store.get_source(URL).content_hash == "h2"
+
+
+def test_search_ranks_matching_chunks_first(store):
+    store.replace_source(URL, "wifakbank", [
+        chunk("Comment ouvrir un compte ?", "En agence avec une pièce d'identité."),
+        chunk("Quel est le taux du crédit immobilier ?", "Le taux du crédit immobilier est de 8%."),
+    ], "h1")
+
+    results = store.search("taux crédit immobilier")
+
+    assert results[0].question == "Quel est le taux du crédit immobilier ?"
+
+
+def test_search_filters_by_bank(store):
+    store.replace_source(URL, "wifakbank", [chunk("Quel est le taux ?", "8% chez Wifak")], "h1")
+    other = "https://www.biat.com.tn/faq"
+    store.replace_source(other, "biat", [chunk("Quel est le taux ?", "7% chez BIAT", bank="biat", url=other)], "h2")
+
+    assert [c.bank for c in store.search("taux", bank="BIAT")] == ["biat"]
+    assert len(store.search("taux")) == 2
+
+
+def test_search_does_not_return_replaced_chunks(store):
+    store.replace_source(URL, "wifakbank", [chunk("Carte perdue ?", "Appelez le centre monétique.")], "h1")
+    store.replace_source(URL, "wifakbank", [chunk("Carte volée ?", "Faites opposition en agence.")], "h2")
+
+    assert store.search("monétique") == []
+    assert [c.question for c in store.search("opposition")] == ["Carte volée ?"]
+
+
+def test_search_without_words_returns_nothing(store):
+    store.replace_source(URL, "wifakbank", [chunk("Quel est le taux ?", "8%")], "h1")
+
+    assert store.search("?!") == []
+
+
+def test_concurrent_writes_and_searches_from_threads(store):
+    def write(i: int) -> None:
+        store.replace_source(f"{URL}/{i}", "wifakbank", [chunk(f"Question {i} taux ?", f"Réponse {i}", url=f"{URL}/{i}")], f"h{i}")
+
+    def read(i: int) -> None:
+        store.search("taux")
+        store.chunks_for_url(f"{URL}/{i}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(write if i % 2 else read, i) for i in range(200)]
+        for future in futures:
+            future.result()
+
+    assert len(store.all_chunks()) == 100
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from beeai_framework.agents.tool_calling import ToolCallingAgent
+from beeai_framework.backend.chat import ChatModel
+from beeai_framework.backend.message import AssistantMessage, MessageToolCallContent, ToolMessage
+from beeai_framework.backend.types import ChatModelOutput
+from beeai_framework.memory import UnconstrainedMemory
+
+import bank_tools
+from bank_service import BankAPIClient, idempotency_key
+from langid import detect_language
+from structured_agent import BankAction, BankRequestPlan, StructuredBankAgent
+
+TRANSFER = {"user": "John Doe", "receiver": "Jane Smith", "amount": 50}
+
+
+class RepeatedTransfer(ChatModel):
+    """Calls MakeTransferTool twice with the same arguments, as an agent retrying a step would, then answers."""
+
+    model_id = "scripted"
+    provider_id = "scripted"
+
+    async def _create(self, input, run):
+        done = sum(isinstance(message, ToolMessage) for message in input.messages)
+        if done < 2:
+            call = MessageToolCallContent(id=f"call-{done}", tool_name="MakeTransferTool", args=json.dumps(TRANSFER))
+        else:
+            call = MessageToolCallContent(id="final", tool_name="final_answer", args=json.dumps({"response": "sent"}))
+        return ChatModelOutput(messages=[AssistantMessage([call])])
+
+    async def _create_stream(self, input, run):
+        yield await self._create(input, run)
+
+    async def _create_structure(self, input, run):
+        raise NotImplementedError
+
+
+def test_idempotency_key_is_random_without_scope():
+    assert idempotency_key(None, "make-transfer", 1) != idempotency_key(None, "make-transfer", 1)
+    assert idempotency_key("turn", "make-transfer", 1) == idempotency_key("turn", "make-transfer", 1)
+    assert idempotency_key("turn", "make-transfer", 1) != idempotency_key("other", "make-transfer", 1)
+
+
+def recorded_keys(monkeypatch) -> list[str]:
+    keys = []
+
+    def send_money(self, emitter, receiver, amount, date=None, idempotency_key=None):
+        keys.append(idempotency_key)
+        return {"message": "Transaction successful"}
+
+    monkeypatch.setattr(BankAPIClient, "send_money", send_money)
+    return keys
+
+
+def test_repeated_write_in_an_agent_run_reuses_its_key(monkeypatch):
+    keys = recorded_keys(monkeypatch)
+
+    async def turn():
+        agent = ToolCallingAgent(llm=RepeatedTransfer(), memory=UnconstrainedMemory(), tools=bank_tools.create_tools("MakeTransferTool"))
+        await agent.run("send 50 to Jane Smith")
+
+    asyncio.run(turn())
+    asyncio.run(turn())
+
+    assert len(keys) == 4
+    # Identical calls in one agent run are one write, see run_scope
+    assert keys[0] == keys[1] and keys[2] == keys[3]
+    assert keys[0] != keys[2]
+
+
+def test_structured_turn_run_again_reuses_its_keys(monkeypatch):
+    keys = recorded_keys(monkeypatch)
+    agent = StructuredBankAgent(user="John Doe", chat_model=RepeatedTransfer(), rephrase=False)
+
+    async def plan(user_input):
+        return BankRequestPlan(operations=[BankAction(action="make-transfer", receiver="Jane Smith", amount=50)])
+
+    monkeypatch.setattr(agent, "plan", plan)
+    english = detect_language("send 50 to Jane Smith")
+    asyncio.run(agent.run("send 50 to Jane Smith", english, turn_id="turn-1"))
+    asyncio.run(agent.run("send 50 to Jane Smith", english, turn_id="turn-1"))
+    asyncio.run(agent.run("send 50 to Jane Smith", english))
+    asyncio.run(agent.run("send 50 to Jane Smith", english))
+
+    assert keys[0] == keys[1]
+    assert len(set(keys)) == 3
+
+
+def test_identical_operations_of_one_call_are_distinct_writes(monkeypatch):
+    keys = recorded_keys(monkeypatch)
+    operation = bank_tools.BankToolInput(action="make-transfer", user="John Doe", receiver="Jane Smith", amount=50)
+
+    asyncio.run(bank_tools.BankOperationsTool().execute([operation, operation], scope="turn-1"))
+
+    assert len(set(keys)) == 2
@@ -0,0 +1,62 @@
+import asyncio
+
+from beeai_framework.emitter.emitter import Emitter
+from beeai_framework.tools.tool import Tool
+from beeai_framework.tools.types import StringToolOutput
+from pydantic import BaseModel
+
+import instrumentation
+from instrumentation import track_turn
+
+
+class SleepInput(BaseModel):
+    seconds: float
+
+
+class SleepTool(Tool):
+    name = "SleepTool"
+    description = "Sleeps for the given number of seconds."
+    input_schema = SleepInput
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "sleep"], creator=self)
+
+    async def _run(self, input: SleepInput, options, context) -> StringToolOutput:
+        await asyncio.sleep(input.seconds)
+        return StringToolOutput("done")
+
+
+def test_finished_run_is_recorded_in_the_turn():
+    instrumentation.install()
+
+    async def turn():
+        with track_turn() as stats:
+            await SleepTool().run(SleepInput(seconds=0))
+        return stats
+
+    stats = asyncio.run(turn())
+
+    assert stats.tool_calls == 1
+    assert [(stage["stage"], stage["name"], stage["ok"]) for stage in stats.stages] == [("tool", "SleepTool", True)]
+    assert not [timer for timer in instrumentation._running.values() if timer.turn is stats]
+
+
+def test_runs_that_never_finish_are_dropped_with_their_turn():
+    instrumentation.install()
+
+    async def turn():
+        with track_turn() as stats:
+            run = asyncio.ensure_future(SleepTool().run(SleepInput(seconds=0.1)))
+            await asyncio.sleep(0.02)
+            # Cancelled again while it emits its events, the run never sends "finish"
+            run.cancel()
+            await asyncio.sleep(0)
+            run.cancel()
+            await asyncio.sleep(0.2)
+            unfinished = [timer for timer in instrumentation._running.values() if timer.turn is stats]
+        return stats, unfinished
+
+    stats, unfinished = asyncio.run(turn())
+
+    assert [timer.name for timer in unfinished] == ["SleepTool"]
+    assert not [timer for timer in instrumentation._running.values() if timer.turn is stats]
@@ -0,0 +1,72 @@
+import pytest
+
+from benchmark import load_corpus
+from langid import detect_language, response_instruction
+from routing_benchmark import DEFAULT_CORPUS
+
+
+@pytest.mark.parametrize("text, code", [
+    ("how much money do i have in my account ?", "en"),
+    ("what is my transaction history?", "en"),
+    ("combien j'ai de l'argent dans mon compte bancaire", "fr"),
+    ("LA BIAT EMET-ELLE DES OBLIGATIONS ?", "fr"),
+    ("ما هو رصيدي الحالي؟", "ar"),
+    ("هل يصدر البنك سندات؟", "ar"),
+])
+def test_languages(text, code):
+    assert detect_language(text).code == code
+
+
+@pytest.mark.parametrize("text, script", [
+    ("قداه عندي فلوس في compte", "arabic"),
+    ("شنوة الأوراق اللي لازمني باش نحل كونت ؟", "arabic"),
+    ("9adeh 3andi flous fel compte", "latin"),
+    ("chnowa el solde mte3i", "latin"),
+])
+def test_derja_in_both_scripts(text, script):
+    language = detect_language(text)
+
+    assert (language.code, language.script) == ("aeb", script)
+
+
+@pytest.mark.parametrize("text, code", [
+    # Digits inside a word are Arabizi letters
+    ("n7eb nab3ath 50 l Jane Smith", "aeb"),
+    ("ab3ath 30 dinar l Jane Smith", "aeb"),
+    # Standalone numbers are amounts, they do not make a message Derja
+    ("send 200 to Jane Smith", "en"),
+    ("transfer 30 to Jane Smith", "en"),
+    ("give me 2000 in 3 days", "en"),
+    ("Je veux envoyer 200 à Jane Smith", "fr"),
+])
+def test_arabizi_digits_versus_amounts(text, code):
+    assert detect_language(text).code == code
+
+
+@pytest.mark.parametrize("text, code", [
+    # Colloquial but not Tunisian: answered in MSA
+    ("كم عندي مال في الحساب", "ar"),
+    ("كم لدي من المال في حسابي", "ar"),
+    # Tunisian words (قداش, فلوس, متاع, نحب) or French words in Arabic script
+    ("قداش عندي فلوس", "aeb"),
+    ("ورّيني آخر العمليات متاعي", "aeb"),
+    ("نحب نبعث 200 لـ Jane Smith", "aeb"),
+    ("اعطيني historique متاعي", "aeb"),
+])
+def test_arabic_versus_derja(text, code):
+    assert detect_language(text).code == code
+
+
+def test_messages_without_letters_default_to_english():
+    assert detect_language("200").code == "en"
+    assert detect_language("?!").code == "en"
+
+
+def test_routing_corpus_languages():
+    corpus = load_corpus(DEFAULT_CORPUS)
+
+    assert [item["id"] for item in corpus if detect_language(item["text"]).code != item["lang"]] == []
+
+
+def test_response_instruction_names_the_language():
+    assert "Tunisian Derja" in response_instruction(detect_language("9adeh 3andi flous fel compte"))
@@ -0,0 +1,32 @@
+import requests
+
+from bank_service import BankAPIClient
+from routing_benchmark import dry_run_writes, routed_intent
+
+
+def test_dry_run_writes_never_reach_the_bank_api(monkeypatch):
+    def no_post(*args, **kwargs):
+        raise AssertionError("a write reached the bank API")
+
+    monkeypatch.setattr(requests, "post", no_post)
+    client = BankAPIClient()
+    with dry_run_writes():
+        transfer = client.send_money("John Doe", "Jane Smith", 10, idempotency_key="k")
+        loan = client.request_loan("John Doe", 500)
+
+    assert "dry run" in transfer["message"]
+    assert loan["loan_id"] == 0
+
+
+def test_dry_run_writes_restores_the_client():
+    send_money, request_loan = BankAPIClient.send_money, BankAPIClient.request_loan
+    with dry_run_writes():
+        assert BankAPIClient.send_money is not send_money
+    assert (BankAPIClient.send_money, BankAPIClient.request_loan) == (send_money, request_loan)
+
+
+def test_routed_intent():
+    assert routed_intent(["GetBalanceTool"]) == "balance"
+    assert routed_intent(["GetLoanStatusTool", "RequestLoanTool"]) == "loan"
+    assert routed_intent(["GetBalanceTool", "MakeTransferTool"]) == "multi"
+    assert routed_intent(["final_answer"]) == "none"
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+from beeai_framework.backend.chat import ChatModel
+from beeai_framework.backend.message import AssistantMessage, MessageToolCallContent, ToolMessage
+from beeai_framework.backend.types import ChatModelOutput
+from beeai_framework.tools.types import StringToolOutput
+
+import bank_tools
+from bank_service import BankAPIClient
+from deadline import DeadlineToolCallingAgent
+from speculative import SpeculativeAgents
+
+BANK_ANSWER = "Your balance is 10.00"
+INFO_ANSWER = "The loan interest rate is 8%"
+
+
+class TwoAgents(ChatModel):
+    """
+    Scripted model for both speculative agents, told apart by their tools. Each agent calls its
+    tool, then answers. `delays` holds the seconds an agent's first and second responses take,
+    `cancelled` makes an agent's first request end as cancelled.
+    """
+
+    model_id = "scripted"
+    provider_id = "scripted"
+
+    def __init__(self, delays: dict[str, tuple[float, float]], cancelled: str = "") -> None:
+        super().__init__()
+        self.delays = delays
+        self.cancelled = cancelled
+        self.requests: list[str] = []
+
+    async def _create(self, input, run):
+        agent = "bank" if any(tool.name == "GetBalanceTool" for tool in input.tools) else "info"
+        answered = any(isinstance(message, ToolMessage) for message in input.messages)
+        self.requests.append(agent)
+        if agent == self.cancelled:
+            raise asyncio.CancelledError()
+        await asyncio.sleep(self.delays[agent][answered])
+        if answered:
+            call = MessageToolCallContent(
+                id=f"{agent}-final", tool_name="final_answer",
+                args=json.dumps({"response": BANK_ANSWER if agent == "bank" else INFO_ANSWER}),
+            )
+        elif agent == "bank":
+            call = MessageToolCallContent(id="bank-1", tool_name="GetBalanceTool", args=json.dumps({"user": "John Doe"}))
+        else:
+            call = MessageToolCallContent(id="info-1", tool_name="FAQSearchTool", args=json.dumps({"query": "loan interest rate"}))
+        return ChatModelOutput(messages=[AssistantMessage([call])])
+
+    async def _create_stream(self, input, run):
+        yield await self._create(input, run)
+
+    async def _create_structure(self, input, run):
+        raise NotImplementedError
+
+
+def offline_tools(monkeypatch):
+    monkeypatch.setattr(BankAPIClient, "get_balance", lambda self, account: {"balance": 10.0})
+
+    async def faq_search(self, input, options, context):
+        return StringToolOutput("Q: What is the loan rate?\nA: 8%")
+
+    monkeypatch.setattr(bank_tools.FAQSearchTool, "_run", faq_search)
+
+
+def run_turn(model: ChatModel) -> tuple[str, float]:
+    async def turn():
+        agents = SpeculativeAgents(user="John Doe", chat_model=model)
+        started = time.perf_counter()
+        answer = await agents.run("can I get a loan and what's the interest rate")
+        return answer, time.perf_counter() - started
+
+    return asyncio.run(turn())
+
+
+def test_both_agents_answering_are_merged_bank_first(monkeypatch):
+    offline_tools(monkeypatch)
+    # BankInfoAgent has called its tool when BankAgent settles the turn, it is awaited
+    model = TwoAgents({"bank": (0.05, 0), "info": (0, 0.2)})
+
+    answer, _ = run_turn(model)
+
+    assert answer == f"{BANK_ANSWER}\n\n{INFO_ANSWER}"
+
+
+def test_agent_without_tool_call_is_cancelled_once_the_other_settles(monkeypatch):
+    offline_tools(monkeypatch)
+    model = TwoAgents({"bank": (0, 0), "info": (1.0, 0)})
+
+    answer, elapsed = run_turn(model)
+
+    assert answer == BANK_ANSWER
+    assert elapsed < 1.0
+    assert model.requests.count("info") == 1
+
+
+def test_agent_cancelled_from_the_inside_does_not_fail_the_turn(monkeypatch):
+    offline_tools(monkeypatch)
+    model = TwoAgents({"bank": (0.05, 0), "info": (0, 0)}, cancelled="info")
+
+    answer, _ = run_turn(model)
+
+    assert answer == BANK_ANSWER
+
+
+def test_candidates_are_deadline_agents():
+    agents = SpeculativeAgents(user="John Doe", chat_model=TwoAgents({}))
+
+    candidate = asyncio.run(agents._fork("BankAgent", "role", "instructions", bank_tools.create_tools("GetBalanceTool")))
+
+    assert isinstance(candidate.agent, DeadlineToolCallingAgent)
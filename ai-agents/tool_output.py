@@ -0,0 +1,94 @@
+import json
+import math
+from typing import Any, Iterator
+
+# Number of history rows shown to the LLM per page, older rows are only fetched on request
+HISTORY_PAGE_SIZE = 5
+# Transaction columns needed to render a history page
+HISTORY_FIELDS = ["date", "emitter", "receiver", "amount"]
+
+
+def render_error(result: Any) -> str:
+    if isinstance(result, dict):
+        return f"error: {result.get('error') or result.get('detail') or json.dumps(result)}"
+    return f"error: {result}"
+
+
+def is_error(result: Any) -> bool:
+    return not isinstance(result, dict) or "error" in result or "detail" in result
+
+
+def render_balance(result: dict[str, Any]) -> str:
+    if is_error(result):
+        return render_error(result)
+    return f"balance={result['balance']:.2f}"
+
+
+def iter_transactions(result: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Transactions of a history response as dicts, whether it is in the row or the columnar format."""
+    transactions = result["transactions"]
+    if result.get("format") != "columnar":
+        yield from transactions
+        return
+    names = list(transactions)
+    for values in zip(*transactions.values()):
+        yield dict(zip(names, values))
+
+
+def render_history(result: dict[str, Any], user: str, page: int = 1, page_size: int = HISTORY_PAGE_SIZE) -> str:
+    """
+    Render a transactions history page as a terse table.
+
+    The header carries the server-computed totals so the LLM does not have to add up rows,
+    amounts are signed from the user's point of view (negative = sent).
+    """
+    if is_error(result) or "transactions" not in result:
+        return render_error(result)
+
+    transactions = list(iter_transactions(result))
+    count = result.get("count", len(transactions))
+    totals = result.get("totals") or {}
+    sent = totals.get("sent", 0.0)
+    received = totals.get("received", 0.0)
+    pages = max(1, math.ceil(count / page_size))
+
+    summary = f"transactions={count} sent={sent:.2f} received={received:.2f} net={received - sent:.2f}"
+    if result.get("archived_before"):
+        # Older transactions are archived by the bank and not part of the totals
+        summary += f" since={str(result['archived_before'])[:10]}"
+    lines = [
+        summary,
+        f"page {page}/{pages}, newest first" + (" (ask for page N for older ones)" if page < pages else ""),
+        "date|counterparty|amount",
+    ]
+    for transaction in transactions:
+        outgoing = transaction["emitter"] == user
+        counterparty = transaction["receiver"] if outgoing else transaction["emitter"]
+        amount = -transaction["amount"] if outgoing else transaction["amount"]
+        date = str(transaction.get("date", ""))[:16].replace("T", " ")
+        lines.append(f"{date}|{counterparty}|{amount:+.2f}")
+    return "\n".join(lines)
+
+
+def render_transfer(result: dict[str, Any]) -> str:
+    if is_error(result):
+        return render_error(result)
+    return result.get("message", json.dumps(result))
+
+
+def render_loan(result: dict[str, Any]) -> str:
+    if is_error(result):
+        return render_error(result)
+    return f"loan_id={result.get('loan_id')} status=pending (decided automatically within minutes)"
+
+
+def render_loans(result: dict[str, Any]) -> str:
+    if is_error(result) or "loans" not in result:
+        return render_error(result)
+    if not result["loans"]:
+        return "no loans"
+    lines = ["loan_id|date|amount|status"]
+    for loan in result["loans"]:
+        date = str(loan.get("date") or "")[:10]
+        lines.append(f"{loan['loan_id']}|{date}|{loan['amount']:.2f}|{loan['status']}")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""
+Group commit of the write endpoints.
+
+With GROUP_COMMIT=1, writes are queued and a single writer coroutine applies them in
+micro-batches of up to GROUP_COMMIT_MAX_BATCH items or GROUP_COMMIT_MAX_WAIT_MS milliseconds, in
+one database transaction: one fsync for the whole batch instead of one per request. Every item
+runs in its own SAVEPOINT so a failing request (insufficient balance, unknown receiver...) only
+rolls back itself, and each caller gets its own result or exception.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("GroupCommit")
+
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "0") == "1"
+MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("GROUP_COMMIT_MAX_WAIT_MS", "5"))
+
+# handler(db, *args) -> result, must not commit
+Handler = Callable[..., Any]
+
+
+def run_in_transaction(session_factory, handler: Handler, *args: Any) -> Any:
+    """Run one write in its own transaction, the behaviour without group commit."""
+    db = session_factory()
+    try:
+        result = handler(db, *args)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# Queued by stop(): the writer finishes the writes queued before it and exits
+_STOP = object()
+
+
+class WriterStopped(RuntimeError):
+    """The writer is not running, or no longer accepting writes."""
+
+
+class GroupCommitWriter:
+    def __init__(self, session_factory, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.accepting = False
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self.accepting = True
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"Group commit enabled: batches of up to {self.max_batch} writes or {self.max_wait * 1000:g} ms")
+
+    async def stop(self) -> None:
+        """Commit the writes already queued, the batch in flight included, then stop."""
+        if self.task is None:
+            return
+        self.accepting = False
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
+
+    async def submit(self, handler: Handler, *args: Any) -> Any:
+        """Queue a write and wait until the batch it belongs to is committed."""
+        if not self.accepting:
+            raise WriterStopped("The group commit writer is stopped")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((handler, args, future))
+        return await future
+
+    async def _collect(self, batch: list[tuple[Handler, tuple, asyncio.Future]]) -> bool:
+        """Fill `batch` with the next writes, returns True when stop() was requested after them."""
+        item = await self.queue.get()
+        if item is _STOP:
+            return True
+        batch.append(item)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                item = self.queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            batch: list[tuple[Handler, tuple, asyncio.Future]] = []
+            stopping = False
+            try:
+                stopping = await self._collect(batch)
+                if batch:
+                    # Requests keep queuing up while the batch is committed, they form the next batch
+                    outcomes = await asyncio.to_thread(self._commit, batch)
+                    for (_, _, future), (ok, value) in zip(batch, outcomes):
+                        _resolve(future, ok, value)
+            except asyncio.CancelledError:
+                # Cancelled without stop() (event loop shutdown): nobody must wait forever
+                self.accepting = False
+                error = WriterStopped("The group commit writer was cancelled")
+                for _, _, future in batch + self._drain():
+                    _resolve(future, False, error)
+                raise
+            except Exception as e:
+                # Only the callers of this batch get the error, the writer goes on with the next one
+                logger.error(f"Group commit writer failed on a batch of {len(batch)} writes: {e}")
+                for _, _, future in batch:
+                    _resolve(future, False, e)
+            if stopping:
+                return
+
+    def _drain(self) -> list[tuple[Handler, tuple, asyncio.Future]]:
+        items = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                items.append(item)
+        return items
+
+    def _commit(self, batch: list[tuple[Handler, tuple, asyncio.Future]]) -> list[tuple[bool, Any]]:
+        db = self.session_factory()
+        outcomes: list[tuple[bool, Any]] = []
+        try:
+            for handler, args, _ in batch:
+                savepoint = db.begin_nested()
+                try:
+                    result = handler(db, *args)
+                    savepoint.commit()
+                    outcomes.append((True, result))
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((False, e))
+            db.commit()
+            return outcomes
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            db.rollback()
+            return [(False, e)] * len(batch)
+        finally:
+            db.close()
+
+
+def _resolve(future: asyncio.Future, ok: bool, value: Any) -> None:
+    # The caller may have gone away (client disconnected), its future is then cancelled
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
@@ -0,0 +1,155 @@
+"""
+Idempotency keys of the write endpoints.
+
+A client sends the same `Idempotency-Key` header with every retry of a write. The response of
+the first successful request is stored in `idempotency_keys`, in the same transaction as the
+write itself (savepoint included under group commit), and is returned again for every repeat of
+the key during IDEMPOTENCY_KEY_TTL_HOURS. Two copies of a request racing each other both run,
+but the second one fails on the primary key, its write is rolled back and it answers with the
+stored response of the first. Failed requests are not stored, nothing was written so a retry
+simply runs again.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, Text, delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger("Idempotency")
+
+HEADER = "Idempotency-Key"
+KEY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+MAX_KEY_LENGTH = 255
+
+metadata = MetaData()
+idempotency_keys = Table(
+    "idempotency_keys",
+    metadata,
+    Column("key", String(MAX_KEY_LENGTH), primary_key=True),
+    Column("endpoint", String(64), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("response", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Index("idempotency_keys_created_at_idx", "created_at"),
+)
+
+
+class DuplicateRequest(Exception):
+    """Another request with the same key committed first, its stored response is the answer."""
+
+
+def request_hash(request: BaseModel, exclude: Optional[set[str]] = None) -> str:
+    return hashlib.sha256(orjson.dumps(request.model_dump(mode="json", exclude=exclude), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def check_key(key: Optional[str]) -> Optional[str]:
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters long")
+    return key
+
+
+def replay_response(body: str) -> ORJSONResponse:
+    return ORJSONResponse(orjson.loads(body), headers={"Idempotent-Replayed": "true"})
+
+
+class IdempotencyStore:
+    def __init__(self, session_factory, ttl: timedelta = KEY_TTL) -> None:
+        self.session_factory = session_factory
+        self.ttl = ttl
+
+    def create_table(self, engine) -> None:
+        metadata.create_all(engine, checkfirst=True)
+
+    def lookup(self, key: str, endpoint: str, fingerprint: str) -> Optional[ORJSONResponse]:
+        """The stored response of `key`, None when the request was not seen or its key expired."""
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(idempotency_keys.c.request_hash, idempotency_keys.c.response).where(
+                    idempotency_keys.c.key == key,
+                    idempotency_keys.c.endpoint == endpoint,
+                    idempotency_keys.c.created_at >= datetime.utcnow() - self.ttl,
+                )
+            ).first()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        if row.request_hash != fingerprint:
+            raise HTTPException(status_code=422, detail=f"{HEADER} {key} was already used for a different request")
+        return replay_response(row.response)
+
+    def recording(self, handler: Callable[..., Any], key: str, endpoint: str, fingerprint: str) -> Callable[..., Any]:
+        """`handler(db, *args)` that also stores its response under `key`, in the same transaction."""
+
+        def run(db, *args: Any) -> Any:
+            result = handler(db, *args)
+            savepoint = db.begin_nested()
+            try:
+                self._store(db, key, endpoint, fingerprint, result)
+                savepoint.commit()
+            except IntegrityError:
+                savepoint.rollback()
+                # An expired key is reused, the write of the request that held it was long committed
+                if not self._take_over(db, key, endpoint, fingerprint, result):
+                    raise DuplicateRequest(key)
+            return result
+
+        return run
+
+    def _take_over(self, db, key: str, endpoint: str, fingerprint: str, result: Any) -> bool:
+        expired = db.execute(
+            delete(idempotency_keys).where(
+                idempotency_keys.c.key == key,
+                idempotency_keys.c.endpoint == endpoint,
+                idempotency_keys.c.created_at < datetime.utcnow() - self.ttl,
+            )
+        ).rowcount
+        if not expired:
+            return False
+        self._store(db, key, endpoint, fingerprint, result)
+        return True
+
+    @staticmethod
+    def _store(db, key: str, endpoint: str, fingerprint: str, result: Any) -> None:
+        db.execute(insert(idempotency_keys).values(
+            key=key, endpoint=endpoint, request_hash=fingerprint,
+            response=orjson.dumps(result).decode(), created_at=datetime.utcnow(),
+        ))
+
+    def purge(self) -> int:
+        """Delete the expired keys, returns how many were deleted."""
+        db = self.session_factory()
+        try:
+            deleted = db.execute(delete(idempotency_keys).where(idempotency_keys.c.created_at < datetime.utcnow() - self.ttl)).rowcount
+            db.commit()
+            if deleted:
+                logger.info(f"Purged {deleted} expired idempotency keys")
+            return deleted
+        finally:
+            db.close()
+
+    def start_purge(self, interval: float = PURGE_INTERVAL) -> threading.Thread:
+        """Purge the expired keys now and then every `interval` seconds in a daemon thread."""
+        stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.is_set():
+                try:
+                    self.purge()
+                except Exception as e:
+                    logger.error(f"Idempotency keys purge failed: {e}")
+                stop.wait(interval)
+
+        thread = threading.Thread(target=loop, name="idempotency-purge", daemon=True)
+        thread.start()
+        return thread
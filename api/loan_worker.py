@@ -0,0 +1,198 @@
+"""
+Batch decision of pending loan requests.
+
+Pending loans are claimed in batches (FOR UPDATE SKIP LOCKED, so several workers can run side by
+side), the applicants' balances, recent transactions and existing loans are loaded with one query
+each, the risk features of the whole batch are computed with NumPy and all the statuses are
+written back with a single UPDATE.
+
+    python loan_worker.py --once
+    python loan_worker.py --interval 5
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import case, func, or_, update
+
+from main import Account, Loan, SessionLocal, Transaction
+from notifications import notify_loans_decided
+
+logger = logging.getLogger("LoanWorker")
+
+BATCH_SIZE = int(os.getenv("LOAN_BATCH_SIZE", "1000"))
+# Transactions older than this are not used to assess the applicant
+LOOKBACK_DAYS = int(os.getenv("LOAN_LOOKBACK_DAYS", "90"))
+# Borrowing capacity: a multiple of the balance plus a few months of positive net inflow
+BALANCE_FACTOR = float(os.getenv("LOAN_BALANCE_FACTOR", "3"))
+NET_INFLOW_MONTHS = float(os.getenv("LOAN_NET_INFLOW_MONTHS", "6"))
+# Applicants whose flows swing more than this many times their balance are rejected
+MAX_VOLATILITY_RATIO = float(os.getenv("LOAN_MAX_VOLATILITY_RATIO", "2"))
+
+
+def compute_features(
+    applicants: np.ndarray,
+    balances: np.ndarray,
+    flow_owner: np.ndarray,
+    flow_amount: np.ndarray,
+    loan_owner: np.ndarray,
+    loan_amount: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Risk features of every applicant, all arrays are indexed by applicant.
+
+    `flow_owner`/`flow_amount` are the signed transaction amounts (positive = received) with the
+    index of the applicant they belong to, `loan_owner`/`loan_amount` the already accepted loans.
+    """
+    n = len(applicants)
+    inflow = np.bincount(flow_owner, weights=np.clip(flow_amount, 0, None), minlength=n)
+    outflow = np.bincount(flow_owner, weights=np.clip(-flow_amount, 0, None), minlength=n)
+    count = np.bincount(flow_owner, minlength=n)
+    squares = np.bincount(flow_owner, weights=flow_amount ** 2, minlength=n)
+    safe_count = np.maximum(count, 1)
+    mean = (inflow - outflow) / safe_count
+    volatility = np.sqrt(np.maximum(squares / safe_count - mean ** 2, 0))
+    existing = np.bincount(loan_owner, weights=loan_amount, minlength=n)
+    return {
+        "balance": balances,
+        "inflow": inflow,
+        "outflow": outflow,
+        "volatility": volatility,
+        "existing_loans": existing,
+    }
+
+
+def decide(features: dict[str, np.ndarray], owner: np.ndarray, amount: np.ndarray, has_account: np.ndarray) -> np.ndarray:
+    """
+    Accept (True) or reject (False) every loan of the batch.
+
+    `owner` is the applicant index of every loan. Loans of the same applicant in one batch are
+    decided in order, each accepted one consuming the capacity left for the next ones; a rejected
+    loan does not.
+    """
+    balance = features["balance"]
+    monthly_net = (features["inflow"] - features["outflow"]) / (LOOKBACK_DAYS / 30)
+    capacity = BALANCE_FACTOR * np.maximum(balance, 0) + NET_INFLOW_MONTHS * np.maximum(monthly_net, 0)
+    capacity -= features["existing_loans"]
+    stable = features["volatility"] <= MAX_VOLATILITY_RATIO * np.maximum(balance, 1)
+
+    eligible = has_account & stable[owner] & (amount > 0)
+    approved = eligible & (amount <= capacity[owner])
+
+    # Applicants with several loans in the batch (few of them): whether a loan fits depends on
+    # which of the previous ones were accepted, so their loans are scanned in order
+    repeated = np.bincount(owner, minlength=len(capacity))[owner] > 1
+    left = capacity.copy()
+    for i in np.flatnonzero(repeated):
+        approved[i] = eligible[i] and amount[i] <= left[owner[i]]
+        if approved[i]:
+            left[owner[i]] -= amount[i]
+    return approved
+
+
+def process_batch(batch_size: int = BATCH_SIZE) -> int:
+    """Decide one batch of pending loans, returns the number of loans decided."""
+    db = SessionLocal()
+    try:
+        loans = (
+            db.query(Loan.id, Loan.user_name, Loan.amount)
+            .filter(Loan.status == "pending")
+            .order_by(Loan.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not loans:
+            db.rollback()
+            return 0
+
+        loan_ids = np.array([loan.id for loan in loans])
+        amount = np.array([loan.amount for loan in loans], dtype=np.float64)
+        applicants, owner = np.unique(np.array([loan.user_name for loan in loans], dtype=object), return_inverse=True)
+        index = {name: i for i, name in enumerate(applicants)}
+        names = list(applicants)
+
+        balances = np.zeros(len(applicants))
+        has_account = np.zeros(len(applicants), dtype=bool)
+        for name, balance in db.query(Account.owner, Account.balance).filter(Account.owner.in_(names)):
+            balances[index[name]] = balance
+            has_account[index[name]] = True
+
+        since = datetime.utcnow() - timedelta(days=LOOKBACK_DAYS)
+        flows = db.query(Transaction.emitter, Transaction.receiver, Transaction.amount).filter(
+            Transaction.date >= since,
+            or_(Transaction.emitter.in_(names), Transaction.receiver.in_(names)),
+        ).all()
+        # A transfer between two applicants counts as outflow for one and inflow for the other
+        flow_owner, flow_amount = [], []
+        for emitter, receiver, value in flows:
+            if emitter in index:
+                flow_owner.append(index[emitter])
+                flow_amount.append(-value)
+            if receiver in index:
+                flow_owner.append(index[receiver])
+                flow_amount.append(value)
+
+        accepted = db.query(Loan.user_name, func.sum(Loan.amount)).filter(
+            Loan.status == "accepted", Loan.user_name.in_(names)
+        ).group_by(Loan.user_name).all()
+
+        features = compute_features(
+            applicants,
+            balances,
+            np.array(flow_owner, dtype=np.int64),
+            np.array(flow_amount, dtype=np.float64),
+            np.array([index[name] for name, _ in accepted], dtype=np.int64),
+            np.array([total for _, total in accepted], dtype=np.float64),
+        )
+        approved = decide(features, owner, amount, has_account[owner])
+
+        statuses = {int(loan_id): "accepted" if ok else "rejected" for loan_id, ok in zip(loan_ids, approved)}
+        db.execute(
+            update(Loan)
+            .where(Loan.id.in_(list(statuses)))
+            .values(status=case(statuses, value=Loan.id))
+            .execution_options(synchronize_session=False)
+        )
+        notify_loans_decided(db, ((loan.user_name, loan.id, statuses[loan.id]) for loan in loans))
+        db.commit()
+        logger.info(f"Decided {len(statuses)} loans: {int(approved.sum())} accepted, {len(statuses) - int(approved.sum())} rejected")
+        return len(statuses)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run(interval: float, batch_size: int = BATCH_SIZE) -> None:
+    while True:
+        try:
+            # Drain the backlog before sleeping
+            while process_batch(batch_size) == batch_size:
+                pass
+        except Exception as e:
+            logger.error(f"Loan decision batch failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Decide pending loan requests in batches.")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("LOAN_WORKER_INTERVAL", "5")), help="Seconds between two polls")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="Decide the current backlog and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        start = time.perf_counter()
+        decided = 0
+        while (batch := process_batch(args.batch_size)) > 0:
+            decided += batch
+        elapsed = time.perf_counter() - start
+        logger.info(f"Decided {decided} loans in {elapsed:.2f}s")
+    else:
+        run(args.interval, args.batch_size)
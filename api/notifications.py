@@ -0,0 +1,48 @@
+"""
+Account change notifications through Postgres LISTEN/NOTIFY.
+
+Writes call these helpers inside their own transaction. Postgres delivers the NOTIFY to the
+listeners (the ai-agents service) when the transaction commits and drops it when it rolls back,
+a failed group commit savepoint included, so listeners only ever hear about committed balances.
+"""
+import logging
+import os
+from typing import Any, Iterable
+
+import orjson
+from sqlalchemy import text
+
+logger = logging.getLogger("Notifications")
+
+CHANNEL = os.getenv("ACCOUNT_EVENTS_CHANNEL", "account_events")
+
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _enabled(db) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _payload(event: dict[str, Any]) -> str:
+    # NOTIFY payloads are limited to 8000 bytes, the events only carry ids, names and amounts
+    return orjson.dumps(event).decode()
+
+
+def notify_balance_changed(db, balances: dict[str, float], transaction: dict[str, Any]) -> None:
+    """Queue a balance_changed event for the owners in `balances`, sent when `db` commits."""
+    if not _enabled(db):
+        return
+    event = {"type": "balance_changed", "balances": balances, "transaction": transaction}
+    db.execute(_NOTIFY, {"channel": CHANNEL, "payload": _payload(event)})
+
+
+def notify_loans_decided(db, decisions: Iterable[tuple[str, int, str]]) -> None:
+    """Queue one loan_decided event per (user, loan id, status), sent when `db` commits."""
+    if not _enabled(db):
+        return
+    params = [
+        {"channel": CHANNEL, "payload": _payload({"type": "loan_decided", "user": user, "loan_id": loan_id, "status": status})}
+        for user, loan_id, status in decisions
+    ]
+    if params:
+        db.execute(_NOTIFY, params)
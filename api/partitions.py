@@ -0,0 +1,104 @@
+"""
+Maintenance of the monthly `transactions` partitions (see db/init.sql).
+
+Future partitions are created ahead of time, so inserts never fall into the default partition,
+and the partitions older than PARTITION_KEEP_MONTHS are moved to `transactions_archive`.
+
+    python partitions.py            # create the upcoming partitions
+    python partitions.py --archive  # also archive the old ones
+"""
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger("Partitions")
+
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# 0 keeps every partition online
+KEEP_MONTHS = int(os.getenv("PARTITION_KEEP_MONTHS", "0"))
+MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", str(24 * 3600)))
+
+
+def archived_before(keep_months: int = KEEP_MONTHS) -> Optional[datetime]:
+    """Start of the oldest month kept online, older transactions are in transactions_archive. None when nothing is archived."""
+    if keep_months <= 0:
+        return None
+    today = datetime.utcnow()
+    # Same cutoff as archive_transactions_partitions: the current month minus keep_months
+    month = today.year * 12 + today.month - 1 - keep_months
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def is_partitioned(db) -> bool:
+    return db.execute(text("SELECT relkind = 'p' FROM pg_class WHERE relname = 'transactions'")).scalar() is True
+
+
+def ensure_partitions(session_factory, months_ahead: int = MONTHS_AHEAD) -> int:
+    """Create the partitions of the current and next `months_ahead` months, returns how many were created."""
+    db = session_factory()
+    try:
+        if not is_partitioned(db):
+            logger.warning("transactions is not partitioned, recreate the database from db/init.sql to enable partitioning")
+            return 0
+        created = db.execute(text("SELECT create_transactions_partitions(0, :ahead)"), {"ahead": months_ahead}).scalar()
+        db.commit()
+        if created:
+            logger.info(f"Created {created} transactions partitions")
+        return created
+    finally:
+        db.close()
+
+
+def archive_partitions(session_factory, keep_months: int = KEEP_MONTHS) -> int:
+    """Move the partitions older than `keep_months` months to transactions_archive, returns how many were moved."""
+    if keep_months <= 0:
+        return 0
+    db = session_factory()
+    try:
+        if not is_partitioned(db):
+            return 0
+        archived = db.execute(text("SELECT archive_transactions_partitions(:keep)"), {"keep": keep_months}).scalar()
+        db.commit()
+        if archived:
+            logger.info(f"Archived {archived} transactions partitions")
+        return archived
+    finally:
+        db.close()
+
+
+def start_maintenance(session_factory, interval: float = MAINTENANCE_INTERVAL) -> threading.Thread:
+    """Run ensure/archive now and then every `interval` seconds in a daemon thread."""
+    stop = threading.Event()
+
+    def loop() -> None:
+        while not stop.is_set():
+            try:
+                ensure_partitions(session_factory)
+                archive_partitions(session_factory)
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            stop.wait(interval)
+
+    thread = threading.Thread(target=loop, name="partition-maintenance", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Create upcoming and archive old transactions partitions.")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    parser.add_argument("--archive", action="store_true", help="Also archive the old partitions")
+    parser.add_argument("--keep-months", type=int, default=KEEP_MONTHS or 12)
+    args = parser.parse_args()
+
+    from main import SessionLocal
+
+    ensure_partitions(SessionLocal, args.months_ahead)
+    if args.archive:
+        archive_partitions(SessionLocal, args.keep_months)
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import diagnostics
+from diagnostics import LoopLagMonitor
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(diagnostics.router)
+    return TestClient(app)
+
+
+def test_admin_endpoints_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(diagnostics, "TOKEN", "")
+
+    assert client.get("/admin/profile", params={"seconds": 0.1}).status_code == 404
+    assert client.get("/admin/profile", headers={"X-Diagnostics-Token": "anything"}).status_code == 404
+    assert client.get("/admin/loop").status_code == 404
+
+
+def test_admin_endpoints_refuse_a_wrong_token(client, monkeypatch):
+    monkeypatch.setattr(diagnostics, "TOKEN", "secret")
+
+    assert client.get("/admin/profile", params={"seconds": 0.1}).status_code == 403
+    assert client.get("/admin/profile", headers={"X-Diagnostics-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/loop", headers={"X-Diagnostics-Token": "wrong"}).status_code == 403
+
+
+def test_profile_with_the_token_returns_folded_stacks(client, monkeypatch):
+    monkeypatch.setattr(diagnostics, "TOKEN", "secret")
+
+    response = client.get(
+        "/admin/profile", params={"seconds": 0.2, "interval_ms": 5, "mode": "wall"}, headers={"X-Diagnostics-Token": "secret"}
+    )
+
+    assert response.status_code == 200
+    assert response.text.strip()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.strip().splitlines())
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+def test_blocking_call_on_the_loop_is_reported_with_its_stack(caplog):
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor.stats()
+
+    with caplog.at_level(logging.WARNING, logger="Diagnostics"):
+        stats = asyncio.run(scenario())
+
+    assert stats["stalls"] == 1
+    assert stats["max_lag_ms"] >= 200
+    stack_reports = [record.getMessage() for record in caplog.records if "loop thread stack" in record.getMessage()]
+    assert len(stack_reports) == 1
+    assert "blocking_call" in stack_reports[0]
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from group_commit import GroupCommitWriter, WriterStopped
+
+
+class FakeSession:
+    """Just enough of a SQLAlchemy session for the writer: savepoints and one commit per batch."""
+
+    commits: list[int] = []
+
+    def __init__(self) -> None:
+        self.applied = 0
+
+    def begin_nested(self):
+        session = self
+
+        class Savepoint:
+            def commit(self):
+                session.applied += 1
+
+            def rollback(self):
+                pass
+
+        return Savepoint()
+
+    def commit(self):
+        FakeSession.commits.append(self.applied)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def slow_write(db, value):
+    time.sleep(0.05)
+    return value
+
+
+def failing_write(db, value):
+    raise ValueError(f"refused {value}")
+
+
+@pytest.fixture(autouse=True)
+def reset_commits():
+    FakeSession.commits = []
+
+
+def test_each_caller_gets_its_own_result():
+    async def scenario():
+        writer = GroupCommitWriter(FakeSession, max_batch=8, max_wait_ms=20)
+        await writer.start()
+        results = await asyncio.gather(
+            writer.submit(slow_write, 1), writer.submit(failing_write, 2), writer.submit(slow_write, 3), return_exceptions=True
+        )
+        await writer.stop()
+        return results
+
+    ok, refused, other = asyncio.run(scenario())
+
+    assert (ok, other) == (1, 3)
+    assert isinstance(refused, ValueError)
+    assert FakeSession.commits == [2]
+
+
+def test_stop_drains_the_batch_in_flight_and_the_queue():
+    async def scenario():
+        writer = GroupCommitWriter(FakeSession, max_batch=2, max_wait_ms=1)
+        await writer.start()
+        calls = [asyncio.create_task(writer.submit(slow_write, value)) for value in range(5)]
+        # The first batch is being committed in the worker thread when stop() is called
+        await asyncio.sleep(0.02)
+        await writer.stop()
+        return [call.result() for call in calls]
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+    assert sum(FakeSession.commits) == 5
+
+
+def test_submit_after_stop_is_refused():
+    async def scenario():
+        writer = GroupCommitWriter(FakeSession)
+        await writer.start()
+        await writer.stop()
+        await writer.submit(slow_write, 1)
+
+    with pytest.raises(WriterStopped):
+        asyncio.run(scenario())
+
+
+def test_writer_keeps_running_after_a_failed_batch():
+    async def scenario():
+        writer = GroupCommitWriter(FakeSession, max_wait_ms=1)
+        commit = writer._commit
+        calls = []
+
+        def broken_once(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("worker thread died")
+            return commit(batch)
+
+        writer._commit = broken_once
+        await writer.start()
+        with pytest.raises(RuntimeError, match="worker thread died"):
+            await asyncio.wait_for(writer.submit(slow_write, 1), 1)
+        result = await asyncio.wait_for(writer.submit(slow_write, 2), 1)
+        await writer.stop()
+        return result
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_cancelled_writer_fails_the_waiting_callers():
+    async def scenario():
+        writer = GroupCommitWriter(FakeSession, max_batch=1, max_wait_ms=1)
+        await writer.start()
+        calls = [asyncio.create_task(writer.submit(slow_write, value)) for value in range(3)]
+        await asyncio.sleep(0.01)
+        writer.task.cancel()
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+
+    assert any(isinstance(result, WriterStopped) for result in results)
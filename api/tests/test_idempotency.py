@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from group_commit import run_in_transaction
+from group_commit import GroupCommitWriter
+from idempotency import DuplicateRequest, IdempotencyStore, idempotency_keys
+from idempotency import metadata as idempotency_metadata
+
+metadata = MetaData()
+transfers = Table("transfers", metadata, Column("id", Integer, primary_key=True), Column("receiver", String, nullable=False))
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    metadata.create_all(engine)
+    idempotency_metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def store(session_factory):
+    return IdempotencyStore(session_factory, ttl=timedelta(hours=1))
+
+
+def transfer(db, receiver):
+    transfer_id = db.execute(insert(transfers).values(receiver=receiver)).inserted_primary_key[0]
+    return {"transfer_id": transfer_id}
+
+
+def failing_transfer(db, receiver):
+    db.execute(insert(transfers).values(receiver=receiver))
+    raise HTTPException(status_code=400, detail="Insufficient balance")
+
+
+def transfer_count(session_factory) -> int:
+    db = session_factory()
+    try:
+        return len(db.execute(select(transfers.c.id)).all())
+    finally:
+        db.close()
+
+
+def store_key(session_factory, key, fingerprint, created_at):
+    db = session_factory()
+    db.execute(insert(idempotency_keys).values(key=key, endpoint="/send-money", request_hash=fingerprint, response='{"transfer_id": 99}', created_at=created_at))
+    db.commit()
+    db.close()
+
+
+def test_response_is_stored_with_the_write_and_replayed(session_factory, store):
+    assert store.lookup("k1", "/send-money", "hash") is None
+
+    result = run_in_transaction(session_factory, store.recording(transfer, "k1", "/send-money", "hash"), "Jane Smith")
+    replay = store.lookup("k1", "/send-money", "hash")
+
+    assert replay.body == b'{"transfer_id":1}'
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert result == {"transfer_id": 1}
+    assert transfer_count(session_factory) == 1
+
+
+def test_failed_write_stores_nothing(session_factory, store):
+    with pytest.raises(HTTPException):
+        run_in_transaction(session_factory, store.recording(failing_transfer, "k1", "/send-money", "hash"), "Jane Smith")
+
+    assert store.lookup("k1", "/send-money", "hash") is None
+    assert transfer_count(session_factory) == 0
+
+
+def test_key_reused_for_a_different_request_is_refused(session_factory, store):
+    run_in_transaction(session_factory, store.recording(transfer, "k1", "/send-money", "hash"), "Jane Smith")
+
+    with pytest.raises(HTTPException) as refused:
+        store.lookup("k1", "/send-money", "other-hash")
+
+    assert refused.value.status_code == 422
+
+
+def test_same_key_on_another_endpoint_is_another_request(session_factory, store):
+    run_in_transaction(session_factory, store.recording(transfer, "k1", "/send-money", "hash"), "Jane Smith")
+
+    assert store.lookup("k1", "/request-loan", "hash") is None
+
+
+def test_request_losing_the_race_is_rolled_back(session_factory, store):
+    # The other copy of the request committed between this one's lookup and its write
+    store_key(session_factory, "k1", "hash", datetime.utcnow())
+
+    with pytest.raises(DuplicateRequest):
+        run_in_transaction(session_factory, store.recording(transfer, "k1", "/send-money", "hash"), "Jane Smith")
+
+    assert transfer_count(session_factory) == 0
+    assert store.lookup("k1", "/send-money", "hash").body == b'{"transfer_id":99}'
+
+
+def test_expired_key_is_taken_over(session_factory, store):
+    store_key(session_factory, "k1", "old-hash", datetime.utcnow() - timedelta(hours=2))
+    assert store.lookup("k1", "/send-money", "hash") is None
+
+    result = run_in_transaction(session_factory, store.recording(transfer, "k1", "/send-money", "hash"), "Jane Smith")
+
+    assert result == {"transfer_id": 1}
+    assert store.lookup("k1", "/send-money", "hash").body == b'{"transfer_id":1}'
+
+
+def test_purge_deletes_the_expired_keys_only(session_factory, store):
+    store_key(session_factory, "old", "hash", datetime.utcnow() - timedelta(hours=2))
+    store_key(session_factory, "recent", "hash", datetime.utcnow())
+
+    assert store.purge() == 1
+    assert store.lookup("recent", "/send-money", "hash") is not None
+
+
+def test_copies_in_one_group_commit_batch_write_once(session_factory, store):
+    async def scenario():
+        writer = GroupCommitWriter(session_factory, max_batch=8, max_wait_ms=20)
+        await writer.start()
+        handler = store.recording(transfer, "k1", "/send-money", "hash")
+        results = await asyncio.gather(writer.submit(handler, "Jane Smith"), writer.submit(handler, "Jane Smith"), return_exceptions=True)
+        await writer.stop()
+        return results
+
+    first, second = asyncio.run(scenario())
+
+    # Each write runs in its own savepoint, the copy is rolled back alone
+    assert first == {"transfer_id": 1}
+    assert isinstance(second, DuplicateRequest)
+    assert transfer_count(session_factory) == 1
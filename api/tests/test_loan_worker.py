@@ -0,0 +1,51 @@
+import numpy as np
+
+from loan_worker import BALANCE_FACTOR, decide
+
+
+def features(balances: list[float], existing_loans: list[float] = None) -> dict[str, np.ndarray]:
+    """Applicants without any recent flow: their capacity is BALANCE_FACTOR times the balance."""
+    n = len(balances)
+    return {
+        "balance": np.asarray(balances, dtype=np.float64),
+        "inflow": np.zeros(n),
+        "outflow": np.zeros(n),
+        "volatility": np.zeros(n),
+        "existing_loans": np.asarray(existing_loans or [0.0] * n, dtype=np.float64),
+    }
+
+
+def run_decide(balances, owner, amount, has_account=None, existing_loans=None) -> list[bool]:
+    owner = np.asarray(owner, dtype=np.int64)
+    has_account = np.ones(len(owner), dtype=bool) if has_account is None else np.asarray(has_account)
+    return decide(features(balances, existing_loans), owner, np.asarray(amount, dtype=np.float64), has_account).tolist()
+
+
+def test_rejected_loan_does_not_consume_the_capacity():
+    balance = 300 / BALANCE_FACTOR
+
+    assert run_decide([balance], [0, 0, 0], [100, 1000, 100]) == [True, False, True]
+
+
+def test_accepted_loans_consume_the_capacity_in_order():
+    balance = 300 / BALANCE_FACTOR
+
+    assert run_decide([balance], [0, 0, 0, 0], [100, 150, 100, 50]) == [True, True, False, True]
+
+
+def test_loans_of_different_applicants_are_independent():
+    balances = [300 / BALANCE_FACTOR, 100 / BALANCE_FACTOR]
+
+    assert run_decide(balances, [0, 1, 0, 1], [200, 100, 200, 1]) == [True, True, False, False]
+
+
+def test_existing_loans_reduce_the_capacity():
+    balance = 300 / BALANCE_FACTOR
+
+    assert run_decide([balance], [0, 0], [150, 100], existing_loans=[200]) == [False, True]
+
+
+def test_unknown_applicant_and_non_positive_amounts_are_rejected():
+    balance = 300 / BALANCE_FACTOR
+
+    assert run_decide([balance, balance], [0, 1, 0], [100, 100, 0], has_account=[True, False, True]) == [True, False, False]
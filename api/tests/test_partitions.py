@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import partitions
+from partitions import archived_before
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2026, 2, 15, 10, 30)
+
+
+def test_nothing_is_archived_without_keep_months():
+    assert archived_before(0) is None
+
+
+def test_archive_cutoff_is_the_current_month_minus_keep_months(monkeypatch):
+    monkeypatch.setattr(partitions, "datetime", FrozenDatetime)
+
+    assert archived_before(1) == datetime(2026, 1, 1)
+    assert archived_before(2) == datetime(2025, 12, 1)
+    assert archived_before(14) == datetime(2024, 12, 1)
@@ -0,0 +1,60 @@
+import importlib
+import time
+
+import pytest
+
+import velocity
+
+LIMIT_VARIABLES = [
+    "VELOCITY_MAX_COUNT_PER_MINUTE", "VELOCITY_MAX_AMOUNT_PER_MINUTE", "VELOCITY_MAX_COUNT_PER_DAY", "VELOCITY_MAX_AMOUNT_PER_DAY",
+]
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """Reload the module with the given limit variables, and without any other."""
+
+    def reload(**limits: str):
+        for name in LIMIT_VARIABLES + ["VELOCITY_REDIS_URL"]:
+            monkeypatch.delenv(name, raising=False)
+        for name, value in limits.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(velocity)
+
+    yield reload
+    for name in LIMIT_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    importlib.reload(velocity)
+
+
+def test_no_limit_by_default(configure):
+    module = configure()
+
+    assert module.DEFAULT_LIMITS == []
+    assert module.create_limiter() is None
+
+
+def test_only_configured_limits_apply(configure):
+    module = configure(VELOCITY_MAX_COUNT_PER_MINUTE="2")
+    limiter = module.create_limiter()
+
+    assert [limit.name for limit in limiter.limits] == ["minute"]
+    assert limiter.acquire("John Doe", 10_000, now=1000.0) is None
+    assert limiter.acquire("John Doe", 10_000, now=1001.0) is None
+    assert limiter.acquire("John Doe", 1, now=1002.0) == "at most 2 transfers per minute"
+    # Other emitters have their own windows, and the window slides
+    assert limiter.acquire("Jane Doe", 1, now=1002.0) is None
+    assert limiter.acquire("John Doe", 1, now=1070.0) is None
+
+
+def test_amount_limit_and_release(configure):
+    module = configure(VELOCITY_MAX_AMOUNT_PER_DAY="1000")
+    limiter = module.create_limiter()
+    now = time.time()
+
+    assert limiter.acquire("John Doe", 800, now=now) is None
+    assert limiter.acquire("John Doe", 300, now=now) == "at most 1000 sent per day"
+    # A transfer that failed after its check gives its amount back
+    limiter.release("John Doe", 800, now=now)
+    assert limiter.acquire("John Doe", 300, now=now) is None
+    assert limiter.acquire("John Doe", 800, now=now) == "at most 1000 sent per day"
@@ -0,0 +1,228 @@
+"""
+Per-emitter velocity limits on transfers (count and amount per minute and per day).
+
+Opt-in: every limit is off until its VELOCITY_MAX_* variable is set, e.g. VELOCITY_MAX_COUNT_PER_MINUTE=5
+and VELOCITY_MAX_AMOUNT_PER_DAY=20000. Without any of them the API does not track transfers at all.
+
+Counters live in memory as bucketed sliding windows, so a check is a few array operations and
+never touches the database. The windows are rebuilt from the recent `transactions` at startup.
+Set VELOCITY_REDIS_URL to share the counters between several API workers through a Redis
+compatible store (requires the `redis` package).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+logger = logging.getLogger("Velocity")
+
+
+class Limit:
+    def __init__(self, name: str, window: int, buckets: int, max_count: Optional[int], max_amount: Optional[float]) -> None:
+        self.name = name
+        self.window = window
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.max_count = max_count
+        self.max_amount = max_amount
+
+
+def _env_number(name: str, default: str, cast=float):
+    value = os.getenv(name, default)
+    return cast(value) if value else None
+
+
+DEFAULT_LIMITS = [
+    limit
+    for limit in (
+        Limit(
+            "minute", 60, 12,
+            _env_number("VELOCITY_MAX_COUNT_PER_MINUTE", "", int),
+            _env_number("VELOCITY_MAX_AMOUNT_PER_MINUTE", ""),
+        ),
+        Limit(
+            "day", 86400, 96,
+            _env_number("VELOCITY_MAX_COUNT_PER_DAY", "", int),
+            _env_number("VELOCITY_MAX_AMOUNT_PER_DAY", ""),
+        ),
+    )
+    if limit.max_count is not None or limit.max_amount is not None
+]
+
+
+class SlidingWindow:
+    """
+    Count and amount of the events of the last `window` seconds, in `buckets` ring slots.
+
+    Totals are kept up to date when buckets expire, so reading them is O(1) and recording an event
+    is amortized O(1). The oldest bucket may be partially outside the window, which makes the
+    limit at most one bucket (window / buckets) stricter than exact.
+    """
+
+    __slots__ = ("limit", "counts", "amounts", "count", "amount", "head")
+
+    def __init__(self, limit: Limit) -> None:
+        self.limit = limit
+        self.counts = [0] * limit.buckets
+        self.amounts = [0.0] * limit.buckets
+        self.count = 0
+        self.amount = 0.0
+        self.head = 0  # absolute index of the newest bucket
+
+    def advance(self, now: float) -> None:
+        current = int(now // self.limit.bucket_seconds)
+        if current <= self.head:
+            return
+        # Buckets between the old head and now have expired
+        for index in range(max(self.head + 1, current - self.limit.buckets + 1), current + 1):
+            slot = index % self.limit.buckets
+            self.count -= self.counts[slot]
+            self.amount -= self.amounts[slot]
+            self.counts[slot] = 0
+            self.amounts[slot] = 0.0
+        self.head = current
+
+    def add(self, now: float, amount: float, count: int = 1) -> None:
+        index = int(now // self.limit.bucket_seconds)
+        if index <= self.head - self.limit.buckets:
+            return  # older than the window
+        slot = index % self.limit.buckets
+        self.counts[slot] += count
+        self.amounts[slot] += amount
+        self.count += count
+        self.amount += amount
+
+    def exceeded_by(self, amount: float) -> Optional[str]:
+        limit = self.limit
+        if limit.max_count is not None and self.count + 1 > limit.max_count:
+            return f"at most {limit.max_count} transfers per {limit.name}"
+        if limit.max_amount is not None and self.amount + amount > limit.max_amount:
+            return f"at most {limit.max_amount:g} sent per {limit.name}"
+        return None
+
+
+class VelocityLimiter:
+    """In-process velocity limits, one set of sliding windows per emitter."""
+
+    def __init__(self, limits: list[Limit] = DEFAULT_LIMITS) -> None:
+        self.limits = limits
+        self.windows: dict[str, list[SlidingWindow]] = {}
+        self.lock = threading.Lock()
+
+    def _windows(self, emitter: str, now: float) -> list[SlidingWindow]:
+        windows = self.windows.get(emitter)
+        if windows is None:
+            windows = self.windows[emitter] = [SlidingWindow(limit) for limit in self.limits]
+        for window in windows:
+            window.advance(now)
+        return windows
+
+    def acquire(self, emitter: str, amount: float, now: Optional[float] = None) -> Optional[str]:
+        """
+        Record a transfer of `amount` by `emitter` if it stays within every limit.
+
+        Returns None when the transfer is allowed, otherwise the reason it is refused (nothing is recorded).
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            windows = self._windows(emitter, now)
+            for window in windows:
+                reason = window.exceeded_by(amount)
+                if reason:
+                    return reason
+            for window in windows:
+                window.add(now, amount)
+        return None
+
+    def release(self, emitter: str, amount: float, now: float) -> None:
+        """Undo an `acquire` made at `now`, for transfers that failed afterwards."""
+        with self.lock:
+            for window in self._windows(emitter, time.time()):
+                window.add(now, -amount, count=-1)
+
+    def rebuild(self, transactions: Iterable[tuple[str, datetime, float]]) -> None:
+        """Reset the windows from the recent (emitter, date, amount) transactions."""
+        now = time.time()
+        with self.lock:
+            self.windows.clear()
+            for emitter, date, amount in transactions:
+                timestamp = date.replace(tzinfo=timezone.utc).timestamp()
+                self._windows(emitter, now)  # aligns the head before the first add
+                for window in self.windows[emitter]:
+                    window.add(timestamp, amount)
+
+
+class RedisVelocityLimiter:
+    """
+    Same limits shared by every worker: one Redis counter per emitter, window and bucket, expiring with the window.
+
+    The check and the increment are two round trips, so concurrent transfers of the same emitter on
+    different workers may overshoot a limit by the number of workers.
+    """
+
+    def __init__(self, url: str, limits: list[Limit] = DEFAULT_LIMITS) -> None:
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.limits = limits
+
+    def _keys(self, emitter: str, limit: Limit, now: float) -> list[str]:
+        current = int(now // limit.bucket_seconds)
+        return [f"velocity:{emitter}:{limit.name}:{index}" for index in range(current - limit.buckets + 1, current + 1)]
+
+    def acquire(self, emitter: str, amount: float, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        pipe = self.redis.pipeline(transaction=False)
+        for limit in self.limits:
+            keys = self._keys(emitter, limit, now)
+            pipe.mget([f"{key}:count" for key in keys])
+            pipe.mget([f"{key}:amount" for key in keys])
+        values = pipe.execute()
+        for i, limit in enumerate(self.limits):
+            count = sum(int(value) for value in values[2 * i] if value)
+            total = sum(float(value) for value in values[2 * i + 1] if value)
+            if limit.max_count is not None and count + 1 > limit.max_count:
+                return f"at most {limit.max_count} transfers per {limit.name}"
+            if limit.max_amount is not None and total + amount > limit.max_amount:
+                return f"at most {limit.max_amount:g} sent per {limit.name}"
+        self._add(emitter, amount, now, 1)
+        return None
+
+    def release(self, emitter: str, amount: float, now: float) -> None:
+        self._add(emitter, -amount, now, -1)
+
+    def _add(self, emitter: str, amount: float, now: float, count: int) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for limit in self.limits:
+            key = self._keys(emitter, limit, now)[-1]
+            pipe.incr(f"{key}:count", count)
+            pipe.incrbyfloat(f"{key}:amount", amount)
+            pipe.expire(f"{key}:count", limit.window + 1)
+            pipe.expire(f"{key}:amount", limit.window + 1)
+        pipe.execute()
+
+    def rebuild(self, transactions: Iterable[tuple[str, datetime, float]]) -> None:
+        # The shared counters survive worker restarts, they are only seeded when the store is empty
+        if self.redis.exists("velocity:seeded"):
+            return
+        for emitter, date, amount in transactions:
+            self._add(emitter, amount, date.replace(tzinfo=timezone.utc).timestamp(), 1)
+        self.redis.set("velocity:seeded", 1, ex=max(limit.window for limit in self.limits))
+
+
+def create_limiter():
+    """The configured limiter, None when no limit is set."""
+    if not DEFAULT_LIMITS:
+        return None
+    url = os.getenv("VELOCITY_REDIS_URL")
+    if url:
+        logger.info("Velocity counters shared through Redis")
+        return RedisVelocityLimiter(url)
+    return VelocityLimiter()
+
+
+def recent_window_start() -> datetime:
+    """Oldest transaction date that can still count against a limit."""
+    return datetime.utcnow() - timedelta(seconds=max(limit.window for limit in DEFAULT_LIMITS))
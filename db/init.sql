@@ -14,13 +14,98 @@ CREATE TABLE IF NOT EXISTS accounts (
     creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Transactions are range partitioned by month on date, history queries filtered on date only
+-- scan the recent partitions. Rows outside every monthly partition land in transactions_default.
 CREATE TABLE IF NOT EXISTS transactions (
-    id SERIAL PRIMARY KEY,
-    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    id SERIAL,
+    date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    emitter VARCHAR(100) NOT NULL,
+    receiver VARCHAR(100) NOT NULL,
+    amount FLOAT NOT NULL,
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT;
+CREATE INDEX IF NOT EXISTS transactions_emitter_date_idx ON transactions (emitter, date DESC);
+CREATE INDEX IF NOT EXISTS transactions_receiver_date_idx ON transactions (receiver, date DESC);
+
+-- Cold storage for the partitions detached by archive_transactions_partitions
+CREATE TABLE IF NOT EXISTS transactions_archive (
+    id INTEGER NOT NULL,
+    date TIMESTAMP NOT NULL,
     emitter VARCHAR(100) NOT NULL,
     receiver VARCHAR(100) NOT NULL,
-    amount FLOAT NOT NULL 
+    amount FLOAT NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
+CREATE INDEX IF NOT EXISTS transactions_archive_emitter_idx ON transactions_archive (emitter, date);
+CREATE INDEX IF NOT EXISTS transactions_archive_receiver_idx ON transactions_archive (receiver, date);
+
+-- Create the monthly partitions from months_back months ago to months_ahead months from now.
+-- Rows of the month already in transactions_default (a transfer dated beyond the pre-created
+-- months) are moved into the new partition, which is only attached once they are out of it:
+-- attaching a range the default partition still has rows for would fail.
+CREATE OR REPLACE FUNCTION create_transactions_partitions(months_back INTEGER DEFAULT 0, months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := 'transactions_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE transactions INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM transactions_default WHERE date >= %L AND date < %L RETURNING id, date, emitter, receiver, amount) '
+                'INSERT INTO %I (id, date, emitter, receiver, amount) SELECT id, date, emitter, receiver, amount FROM moved',
+                month_start, month_end, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE transactions ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move the monthly partitions entirely older than keep_months months to transactions_archive
+CREATE OR REPLACE FUNCTION archive_transactions_partitions(keep_months INTEGER DEFAULT 12)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => keep_months))::DATE;
+    old_partition RECORD;
+    archived INTEGER := 0;
+BEGIN
+    FOR old_partition IN
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'transactions'
+          AND child.relname ~ '^transactions_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(child.relname FROM 14), 'YYYY_MM') + INTERVAL '1 month' <= cutoff
+        ORDER BY child.relname
+    LOOP
+        EXECUTE format('ALTER TABLE transactions DETACH PARTITION %I', old_partition.name);
+        EXECUTE format(
+            'INSERT INTO transactions_archive (id, date, emitter, receiver, amount) SELECT id, date, emitter, receiver, amount FROM %I',
+            old_partition.name
+        );
+        EXECUTE format('DROP TABLE %I', old_partition.name);
+        archived := archived + 1;
+    END LOOP;
+    RETURN archived;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_transactions_partitions(12, 3);
 
 CREATE TABLE IF NOT EXISTS loans (
     id SERIAL PRIMARY KEY,
@@ -30,6 +115,17 @@ CREATE TABLE IF NOT EXISTS loans (
     status VARCHAR(20) CHECK (status IN ('pending', 'rejected', 'accepted'))
 );
 
+-- Responses of the write endpoints by Idempotency-Key, replayed to the retries (see api/idempotency.py)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) NOT NULL,
+    endpoint VARCHAR(64) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (key, endpoint)
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created_at_idx ON idempotency_keys (created_at);
+
 -- Insert fake data (use ON CONFLICT only for columns with UNIQUE constraints)
 INSERT INTO users (name, rib, email, phone)
 VALUES 
@@ -5,7 +5,7 @@ import * as React from "react"
 import { MessageSquareIcon, SendIcon, WifiOffIcon, XIcon } from "lucide-react"
 import { AnimatePresence, motion } from "framer-motion"
 
-import { ConnectionStatus, type ChatMessage, type SocketService, getSocketService } from "@/lib/socket-service"
+import { ConnectionStatus, type AccountEvent, type ChatMessage, type SocketService, getSocketService } from "@/lib/socket-service"
 import { Avatar, AvatarFallback, AvatarImage } from "@/components/ui/avatar"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardFooter, CardHeader } from "@/components/ui/card"
@@ -16,6 +16,15 @@ import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "@/comp
 // Replace with your actual WebSocket server URL
 const SOCKET_URL = process.env.NEXT_PUBLIC_WEBSOCKET_URL || "ws://localhost:8001/chat?user=John+Doe"
 
+const describeAccountEvent = (event: AccountEvent): string => {
+  if (event.type === "loan_decided") {
+    return `Your loan request #${event.loan_id} has been ${event.status}.`
+  }
+  const { emitter, receiver, amount } = event.transaction
+  return `Transfer of ${amount} from ${emitter} to ${receiver} completed.` +
+    (event.balance != null ? ` Your balance is now ${event.balance}.` : "")
+}
+
 export function ChatButton() {
   const [isOpen, setIsOpen] = React.useState(false)
   const [messages, setMessages] = React.useState<ChatMessage[]>([
@@ -70,6 +79,19 @@ export function ChatButton() {
         if (!parsedData.isThinking) {
           setIsTyping(true) // Start typing when thinking ends
         }
+      } else if (parsedData.type === "turn_stats") {
+        // Debug statistics of the turn, not shown in the chat
+      } else if (parsedData.type === "balance_changed" || parsedData.type === "loan_decided") {
+        const accountEvent = parsedData as AccountEvent
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: `${accountEvent.type}-${Date.now()}`,
+            content: describeAccountEvent(accountEvent),
+            sender: "assistant",
+            timestamp: new Date(),
+          },
+        ])
       } else if (parsedData.type === "typing") {
         setIsTyping(parsedData.isTyping)
       } else if (parsedData.type === "message") {
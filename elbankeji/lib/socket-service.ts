@@ -9,6 +9,24 @@ export enum ConnectionStatus {
   ERROR = "error",
 }
 
+// Events pushed by the server outside of the answers (see ai-agents/account_events.py)
+export interface BalanceChangedEvent {
+  type: "balance_changed"
+  balances: Record<string, number>
+  // Balance of the user of this session
+  balance: number | null
+  transaction: { id: number; date: string; emitter: string; receiver: string; amount: number }
+}
+
+export interface LoanDecidedEvent {
+  type: "loan_decided"
+  user: string
+  loan_id: number
+  status: "accepted" | "rejected"
+}
+
+export type AccountEvent = BalanceChangedEvent | LoanDecidedEvent
+
 export interface ChatMessage {
   id: string
   content: string
@@ -108,7 +126,7 @@ export class SocketService {
   private handleMessage(event: MessageEvent): void {
     try {
       console.log("Received message:", event.data)
-      const data = event.data
+      const data = parseFrame(event.data)
       this.messageCallbacks.forEach((callback) => callback(data))
     } catch (error) {
       console.error("Error parsing message:", error)
@@ -148,6 +166,17 @@ export class SocketService {
   }
 }
 
+// Typed JSON frames ({"type": ...}) are parsed, the agent answers are plain text and stay strings
+export const parseFrame = (data: any): any => {
+  if (typeof data !== "string" || !data.startsWith("{")) return data
+  try {
+    const parsed = JSON.parse(data)
+    return parsed && typeof parsed === "object" && "type" in parsed ? parsed : data
+  } catch {
+    return data
+  }
+}
+
 // Create a singleton instance
 let socketInstance: SocketService | null = null
 
@@ -0,0 +1,205 @@
+"""
+Event loop stall detection and on-demand sampling profiler of the api and ai-agents services.
+
+This module is not part of either service directory: the Dockerfiles copy it from the `shared`
+build context (see docker-compose.yml) into /opt/shared, which is on their PYTHONPATH. Outside
+of the images, run the services with PYTHONPATH=../shared.
+
+`LoopLagMonitor` runs a heartbeat coroutine on the event loop and a watchdog thread next to it.
+When the heartbeat is late by more than LOOP_LAG_THRESHOLD_MS, the watchdog logs the stack the
+loop thread is stuck in: the synchronous call inside the coroutine or callback that blocks it.
+
+`GET /admin/profile?seconds=10` samples the stacks of every thread for a few seconds and returns
+them in the folded format of flamegraph.pl, speedscope and inferno:
+
+    curl -H "X-Diagnostics-Token: $DIAGNOSTICS_TOKEN" "localhost:8000/admin/profile?seconds=10" > api.folded
+    flamegraph.pl api.folded > api.svg
+
+In "cpu" mode (Linux) a stack counts for the CPU ticks its thread spent since the previous
+sample, idle threads drop out; "wall" mode counts every sample. The admin endpoints are disabled
+while DIAGNOSTICS_TOKEN is not set.
+"""
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+logger = logging.getLogger("Diagnostics")
+
+LOOP_MONITOR = os.getenv("LOOP_LAG_MONITOR", "1") == "1"
+LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000
+LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")) / 1000
+TOKEN = os.getenv("DIAGNOSTICS_TOKEN", "")
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+# Per-thread CPU time is read from procfs, elsewhere only wall-clock profiles are available
+CPU_PROFILING = os.path.isdir("/proc/self/task")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = LAG_INTERVAL, threshold: float = LAG_THRESHOLD) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.task: Optional[asyncio.Task] = None
+        self.loop_thread: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.stop_event = threading.Event()
+        # Beat of the stall the stack was already logged for, one report per stall
+        self.reported_beat: Optional[float] = None
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - self.last_beat - self.interval, 0.0)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def _watch(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            beat = self.last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled <= self.threshold or beat == self.reported_beat:
+                continue
+            self.reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(f"Event loop blocked for more than {stalled * 1000:.0f} ms, loop thread stack:\n{stack}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+    def start(self) -> None:
+        if self.task is not None:
+            return
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stop_event.clear()
+        self.task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+        logger.info(f"Event loop lag monitor started, threshold {self.threshold * 1000:g} ms")
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.stop_event.set()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+
+def _cpu_ticks(native_id: int) -> Optional[int]:
+    """User + system CPU ticks of a thread of this process."""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", "rb") as f:
+            # The thread name can contain spaces, the fields start after its closing parenthesis
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return int(fields[11]) + int(fields[12])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _fold(thread_name: str, frame, lines: bool) -> str:
+    """Folded stack, root first: "thread;func (file.py:12);..."."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        location = f"{os.path.basename(code.co_filename)}:{frame.f_lineno}" if lines else os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({location})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float, mode: str = "cpu", lines: bool = False) -> Counter:
+    """Sample the stacks of every other thread for `seconds`, returns the count of every folded stack."""
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    previous_ticks: dict[int, Optional[int]] = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            thread = threads.get(ident)
+            if ident == me or thread is None:
+                continue
+            weight = 1
+            if mode == "cpu":
+                ticks = _cpu_ticks(thread.native_id)
+                last = previous_ticks.get(ident)
+                previous_ticks[ident] = ticks
+                if ticks is None or last is None:
+                    continue
+                weight = ticks - last
+                if weight <= 0:
+                    continue
+            counts[_fold(thread.name, frame, lines)] += weight
+        time.sleep(interval)
+    return counts
+
+
+monitor = LoopLagMonitor()
+router = APIRouter(prefix="/admin")
+_profiling = threading.Lock()
+
+
+def _authorize(token: Optional[str]) -> None:
+    if not TOKEN:
+        raise HTTPException(status_code=404, detail="Diagnostics are disabled, set DIAGNOSTICS_TOKEN to enable them")
+    if token is None or not hmac.compare_digest(token, TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid diagnostics token")
+
+
+@router.get("/loop")
+async def loop_lag(x_diagnostics_token: Optional[str] = Header(None)):
+    _authorize(x_diagnostics_token)
+    return monitor.stats()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    mode: str = Query("cpu" if CPU_PROFILING else "wall", pattern="^(cpu|wall)$"),
+    lines: bool = Query(False, description="Keep the line numbers, one frame per line instead of per function"),
+    x_diagnostics_token: Optional[str] = Header(None),
+):
+    _authorize(x_diagnostics_token)
+    if mode == "cpu" and not CPU_PROFILING:
+        raise HTTPException(status_code=400, detail="CPU profiles need /proc, use mode=wall")
+    if not _profiling.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    try:
+        # The sampler sleeps between samples in its own thread, the loop keeps serving meanwhile
+        counts = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, mode, lines)
+    finally:
+        _profiling.release()
+    folded = "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+    filename = f"profile-{mode}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.folded"
+    return PlainTextResponse(folded + "\n", headers={"Content-Disposition": f'attachment; filename="{filename}"'})